@@ -6,12 +6,15 @@ import voluptuous as vol
 
 from homeassistant import exceptions
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, ServiceCall
 from homeassistant.components.sensor import DOMAIN as SENSOR
+import homeassistant.helpers.config_validation as cv
 
-from nswcovid import NSWCovid
-
-from .const import DOMAIN
+from .backfill import async_backfill
+from .const import ATTR_PATH, DOMAIN, SERVICE_BACKFILL
+from .coordinator import NSWCovidCoordinator
+from .devices import async_migrate_devices
+from .tracker import preload
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -19,6 +22,8 @@ CONFIG_SCHEMA = vol.Schema({DOMAIN: vol.Schema({})}, extra=vol.ALLOW_EXTRA)
 
 PLATFORMS = [SENSOR]
 
+BACKFILL_SCHEMA = vol.Schema({vol.Required(ATTR_PATH): cv.string})
+
 
 def logging_handler(payload: object):
     """For debugging mostly"""
@@ -27,6 +32,20 @@ def logging_handler(payload: object):
 
 async def async_setup(hass: HomeAssistant, config: dict):
     """Set up the NSWCovid component."""
+
+    async def async_handle_backfill(call: ServiceCall):
+        """Import an archive of past publications into long-term statistics."""
+        path = call.data[ATTR_PATH]
+        if not hass.config.is_allowed_path(path):
+            raise exceptions.HomeAssistantError(f"{path} is not an allowed path")
+        coordinators = list(hass.data.get(DOMAIN, {}).values())
+        if not coordinators:
+            raise exceptions.HomeAssistantError("NSW Covid is not set up")
+        await async_backfill(hass, path, coordinators[0].tracker.statistics)
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_BACKFILL, async_handle_backfill, schema=BACKFILL_SCHEMA
+    )
     return True
 
 
@@ -36,12 +55,18 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     if not DOMAIN in hass.data:
         hass.data[DOMAIN] = {}
 
-    hass.data[DOMAIN][entry.entry_id] = NSWCovid(loop=hass.loop)
+    # The statistics library is slow to import, keep it off the event loop
+    await hass.async_add_executor_job(preload)
+
+    coordinator = NSWCovidCoordinator(hass, entry)
+    hass.data[DOMAIN][entry.entry_id] = coordinator
 
-    hass.data[DOMAIN][entry.entry_id].addListener(logging_handler)
+    coordinator.add_listener(logging_handler)
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
 
-    if not await hass.data[DOMAIN][entry.entry_id].refresh():
-        raise CannotConnect
+    # Start from the last snapshot, the tracker refreshes in the background
+    if not await coordinator.async_restore():
+        _LOGGER.debug("No snapshot available, waiting for first refresh")
 
     for component in PLATFORMS:
         hass.async_create_task(
@@ -51,6 +76,25 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     return True
 
 
+async def async_migrate_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """Migrate an entry created by an earlier version."""
+    if entry.version == 1:
+        # Entities had a device each, move them onto the shared devices
+        async_migrate_devices(hass, entry)
+        try:
+            hass.config_entries.async_update_entry(entry, version=2)
+        except TypeError:
+            entry.version = 2
+            hass.config_entries.async_update_entry(entry)
+        _LOGGER.info("Migrated NSW Covid entry to version %d", entry.version)
+    return True
+
+
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """Reload an entry so changed options take effect."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Unload a config entry."""
     unload_ok = all(
@@ -62,7 +106,8 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
         )
     )
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
+        coordinator = hass.data[DOMAIN].pop(entry.entry_id)
+        await coordinator.async_shutdown()
 
     return unload_ok
 
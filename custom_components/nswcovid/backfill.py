@@ -0,0 +1,107 @@
+"""Backfill long-term statistics from an archive of past NSW Health publications.
+
+An archive is a CSV file, or a JSON lines file, with one publication per
+row in date order. The date column holds the publication day as
+YYYY-MM-DD, and every other column named after a statistic id holds that
+statistic's value for the day.
+"""
+import csv
+from datetime import date
+import json
+import logging
+
+from homeassistant.core import HomeAssistant
+
+from .const import BACKFILL_CHUNK_DAYS
+from .longterm import async_import_statistics, async_seed_sums
+
+_LOGGER = logging.getLogger(__name__)
+
+ATTR_DATE = "date"
+
+
+def read_archive(path, statistic_ids):
+    """Yield (day, values) for each publication in the archive, one at a time."""
+    previous = None
+    ignored = set()
+    with open(path, newline="", encoding="utf-8") as archive:
+        if path.endswith(".csv"):
+            rows = csv.DictReader(archive)
+        else:
+            rows = (json.loads(line) for line in archive if line.strip())
+        for number, row in enumerate(rows, 1):
+            try:
+                day = date.fromisoformat(str(row.get(ATTR_DATE))[:10])
+            except ValueError:
+                _LOGGER.warning("Skipping row %d, no valid %s", number, ATTR_DATE)
+                continue
+            if previous is not None and day <= previous:
+                _LOGGER.warning("Skipping row %d, %s is out of order", number, day)
+                continue
+            previous = day
+            values = {}
+            for key, value in row.items():
+                if key == ATTR_DATE or value in (None, ""):
+                    continue
+                if key not in statistic_ids:
+                    if key not in ignored:
+                        _LOGGER.warning("Ignoring unknown statistic %s", key)
+                        ignored.add(key)
+                    continue
+                try:
+                    values[key] = _number(value)
+                except ValueError:
+                    _LOGGER.warning("Skipping %s on row %d: %s", key, number, value)
+            yield day, values
+
+
+def chunks(publications, days=BACKFILL_CHUNK_DAYS):
+    """Group publications into series of (day, value) rows, days at a time.
+
+    Chunks without a single value are skipped, so none is empty.
+    """
+    series = {}
+    count = 0
+    for day, values in publications:
+        for key, value in values.items():
+            series.setdefault(key, []).append((day, value))
+        count += 1
+        if count >= days:
+            # Days without a value for any statistic are nothing to import
+            if series:
+                yield series
+            series = {}
+            count = 0
+    if series:
+        yield series
+
+
+async def async_backfill(hass: HomeAssistant, path, statistics):
+    """Import an archive into long-term statistics, returns the rows queued.
+
+    The archive is read in the executor a chunk at a time, so memory stays
+    flat however many years it covers. Running totals carry on from the rows
+    imported before the archive starts.
+    """
+    reader = chunks(read_archive(path, statistics))
+    sums = {}
+    queued = 0
+    while True:
+        series = await hass.async_add_executor_job(next, reader, None)
+        if series is None:
+            break
+        await async_seed_sums(hass, statistics, series, sums)
+        queued += async_import_statistics(hass, statistics, series, sums)
+    _LOGGER.info("Backfilled %d long-term statistic rows from %s", queued, path)
+    return queued
+
+
+def _number(value):
+    """Return an archive value as an int where possible, otherwise a float."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    value = str(value).replace(",", "").strip()
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
@@ -0,0 +1,100 @@
+"""Compact age and sex buckets for the NSW Covid case and death breakdowns."""
+from array import array
+
+from .const import AGE_GROUPS, SEXES
+
+LAYOUTS = {}
+
+
+def layout(measure):
+    """Return the bucket keys and their indices for measure, shared by instances."""
+    if measure not in LAYOUTS:
+        keys = tuple(f"{measure}_{sex}_{age}" for sex in SEXES for age in AGE_GROUPS)
+        LAYOUTS[measure] = (keys, {key: index for index, key in enumerate(keys)})
+    return LAYOUTS[measure]
+
+
+class AgeSexBuckets:
+    """A sex by age decade grid of counts for one measure, such as cases.
+
+    Counts live in a single flat array in sex major order, so a sex is a
+    contiguous slice and an age group is a fixed stride. Buckets are
+    addressed by the statistic ids NSW Health publishes them under, for
+    example cases_female_40_49.
+    """
+
+    __slots__ = ("__measure", "__keys", "__index", "__counts", "__known", "__total")
+
+    def __init__(self, measure):
+        """Set up empty buckets for measure."""
+        self.__measure = measure
+        self.__keys, self.__index = layout(measure)
+        self.__counts = array("q", bytes(8 * len(self.__keys)))
+        self.__known = bytearray(len(self.__keys))
+        self.__total = 0
+
+    @property
+    def measure(self):
+        """Return the measure the buckets count."""
+        return self.__measure
+
+    @property
+    def keys(self):
+        """Return the statistic id of every bucket."""
+        return self.__keys
+
+    @property
+    def total(self):
+        """Return the sum over every bucket."""
+        return self.__total
+
+    def __contains__(self, key):
+        return key in self.__index
+
+    def __getitem__(self, key):
+        index = self.__index[key]
+        if not self.__known[index]:
+            return None
+        return self.__counts[index]
+
+    def get(self, key, default=None):
+        """Return the count for a statistic id, or default if it is unknown."""
+        if key not in self.__index:
+            return default
+        return self[key]
+
+    def set(self, key, value):
+        """Store a statistic's value, returns True if the bucket changed."""
+        index = self.__index[key]
+        known = value is not None
+        value = int(value) if known else 0
+        if known == bool(self.__known[index]) and value == self.__counts[index]:
+            return False
+        self.__total += value - self.__counts[index]
+        self.__counts[index] = value
+        self.__known[index] = known
+        return True
+
+    def clear(self):
+        """Forget every count."""
+        for index in range(len(self.__keys)):
+            self.__counts[index] = 0
+            self.__known[index] = 0
+        self.__total = 0
+
+    def sex_total(self, sex):
+        """Return the sum over every age group for one sex."""
+        width = len(AGE_GROUPS)
+        start = SEXES.index(sex) * width
+        return sum(self.__counts[start : start + width])
+
+    def age_total(self, age):
+        """Return the sum over both sexes for one age group."""
+        return sum(self.__counts[AGE_GROUPS.index(age) :: len(AGE_GROUPS)])
+
+    def items(self):
+        """Return (statistic id, count) pairs, None for unknown buckets."""
+        return [
+            (key, self.__counts[index] if self.__known[index] else None)
+            for index, key in enumerate(self.__keys)
+        ]
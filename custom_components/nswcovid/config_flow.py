@@ -3,12 +3,27 @@ import logging
 
 import voluptuous as vol
 
-from homeassistant import config_entries, core, exceptions
+from homeassistant import config_entries, exceptions
+from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
+import homeassistant.helpers.config_validation as cv
 
-from nswcovid import NSWCovid
-
-from .const import DOMAIN
+from .const import (
+    CONF_GROUPS,
+    CONF_IDLE_INTERVAL,
+    CONF_OPEN_DATA_URL,
+    CONF_SNAPSHOT_URL,
+    CONF_WINDOW_END,
+    CONF_WINDOW_INTERVAL,
+    CONF_WINDOW_START,
+    DEFAULT_IDLE_INTERVAL,
+    DEFAULT_WINDOW_END,
+    DEFAULT_WINDOW_INTERVAL,
+    DEFAULT_WINDOW_START,
+    DOMAIN,
+    GROUP_NAMES,
+    GROUPS,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -17,25 +32,104 @@ _LOGGER = logging.getLogger(__name__)
 class ConfigFlow(config_entries.ConfigFlow):
 
     # The schema version of the entries that it creates
-    # Home Assistant will call your migrate method if the version changes
-    # (this is not implemented yet)
-    VERSION = 1
+    # Home Assistant will call async_migrate_entry if the version changes
+    # 2: entities are grouped under shared devices rather than one each
+    VERSION = 2
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Return the options flow for an entry."""
+        return OptionsFlowHandler(config_entry)
 
     async def async_step_user(self, user_input=None) -> FlowResult:
         """Handle a flow initialized by the user."""
-        return await self.async_step_init(user_input)
-
-    async def async_step_init(self, user_input=None) -> FlowResult:
-        """Handle user step."""
-        api = NSWCovid(loop=self.hass.loop)
         await self.async_set_unique_id(DOMAIN)
         self._abort_if_unique_id_configured()
-        return self.async_create_entry(
-            title="NSW Covid",
-            data={},
+        errors = {}
+        if user_input is not None:
+            try:
+                snapshot_url = _optional_url(user_input.get(CONF_SNAPSHOT_URL))
+            except vol.Invalid:
+                errors[CONF_SNAPSHOT_URL] = "invalid_url"
+            else:
+                data = {CONF_SNAPSHOT_URL: snapshot_url} if snapshot_url else {}
+                return self.async_create_entry(title="NSW Covid", data=data)
+
+        return self.async_show_form(
+            step_id="user",
+            data_schema=vol.Schema({vol.Optional(CONF_SNAPSHOT_URL, default=""): str}),
+            errors=errors,
         )
 
 
+class OptionsFlowHandler(config_entries.OptionsFlow):
+    """Choose which statistics are tracked, where from and how often."""
+
+    def __init__(self, config_entry):
+        """Set up the options flow."""
+        self.config_entry = config_entry
+
+    async def async_step_init(self, user_input=None) -> FlowResult:
+        """Handle the options step."""
+        errors = {}
+        if user_input is not None:
+            for key in (CONF_SNAPSHOT_URL, CONF_OPEN_DATA_URL):
+                try:
+                    user_input[key] = _optional_url(user_input.get(key))
+                except vol.Invalid:
+                    errors[key] = "invalid_url"
+            if user_input[CONF_WINDOW_END] <= user_input[CONF_WINDOW_START]:
+                errors["base"] = "invalid_window"
+            if not errors:
+                return self.async_create_entry(title="", data=user_input)
+
+        options = self.config_entry.options
+        snapshot_url = options.get(
+            CONF_SNAPSHOT_URL, self.config_entry.data.get(CONF_SNAPSHOT_URL)
+        )
+        schema = vol.Schema(
+            {
+                vol.Required(
+                    CONF_GROUPS, default=list(options.get(CONF_GROUPS, GROUPS))
+                ): cv.multi_select(GROUP_NAMES),
+                vol.Required(
+                    CONF_WINDOW_START,
+                    default=options.get(CONF_WINDOW_START, DEFAULT_WINDOW_START.hour),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=22)),
+                vol.Required(
+                    CONF_WINDOW_END,
+                    default=options.get(CONF_WINDOW_END, DEFAULT_WINDOW_END.hour),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=23)),
+                vol.Required(
+                    CONF_WINDOW_INTERVAL,
+                    default=options.get(
+                        CONF_WINDOW_INTERVAL,
+                        int(DEFAULT_WINDOW_INTERVAL.total_seconds() // 60),
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=60)),
+                vol.Required(
+                    CONF_IDLE_INTERVAL,
+                    default=options.get(
+                        CONF_IDLE_INTERVAL,
+                        int(DEFAULT_IDLE_INTERVAL.total_seconds() // 60),
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=15, max=1440)),
+                vol.Optional(CONF_SNAPSHOT_URL, default=snapshot_url or ""): str,
+                vol.Optional(
+                    CONF_OPEN_DATA_URL, default=options.get(CONF_OPEN_DATA_URL, "")
+                ): str,
+            }
+        )
+        return self.async_show_form(step_id="init", data_schema=schema, errors=errors)
+
+
+def _optional_url(value):
+    """Return a valid URL, or an empty string when none was entered."""
+    value = (value or "").strip()
+    return cv.url(value) if value else ""
+
+
 class CannotConnect(exceptions.HomeAssistantError):
     """Error to indicate we cannot connect."""
 
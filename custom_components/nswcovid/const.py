@@ -1,6 +1,7 @@
 """Constants used by NSW Covid components."""
 from __future__ import annotations
 
+from datetime import time, timedelta
 from typing import Final
 
 DOMAIN: Final = "nswcovid"
@@ -11,9 +12,60 @@ NSWHEALTH_HOST: Final = "www.health.nsw.gov.au"
 NSWHEALTH_PATH: Final = "Infectious/covid-19/Pages/stats-nsw.aspx"
 
 NSWHEALTH_NAME: Final = "Covid NSW"
+NSWHEALTH_TIMEZONE: Final = "Australia/Sydney"
 
 NSWHEALTH_UPDATE: Final = f"{DOMAIN}_tracker_update"
 
+# NSW Health publishes once a day, usually some time after the 11am briefing
+DEFAULT_WINDOW_START: Final = time(10, 0)
+DEFAULT_WINDOW_END: Final = time(20, 0)
+DEFAULT_WINDOW_INTERVAL: Final = timedelta(minutes=5)
+DEFAULT_IDLE_INTERVAL: Final = timedelta(hours=3)
+DEFAULT_RETRY_INTERVAL: Final = timedelta(minutes=1)
+DEFAULT_MAX_BACKOFF: Final = timedelta(minutes=30)
+
+CONF_GROUPS: Final = "groups"
+CONF_WINDOW_START: Final = "window_start"
+CONF_WINDOW_END: Final = "window_end"
+CONF_WINDOW_INTERVAL: Final = "window_interval"
+CONF_IDLE_INTERVAL: Final = "idle_interval"
+CONF_SNAPSHOT_URL: Final = "snapshot_url"
+CONF_OPEN_DATA_URL: Final = "open_data_url"
+
+SNAPSHOT_STORAGE_VERSION: Final = 1
+SNAPSHOT_SAVE_DELAY: Final = 10
+
+HISTORY_STORAGE_VERSION: Final = 1
+HISTORY_SIZE: Final = 28
+ROLLING_WINDOW: Final = 7
+
+SERVICE_BACKFILL: Final = "backfill"
+ATTR_PATH: Final = "path"
+BACKFILL_CHUNK_DAYS: Final = 90
+
+METRICS_WINDOW: Final = 48
+
+TIMESTAMP_TYPES: Final = ["nswcoviddate", "date", "time", "datetime", "dateymd"]
+
+FETCH_CONNECT_TIMEOUT: Final = 10
+FETCH_READ_TIMEOUT: Final = 30
+FETCH_TOTAL_TIMEOUT: Final = 60
+FETCH_CHUNK_SIZE: Final = 16384
+
+SEXES: Final = ("female", "male")
+AGE_GROUPS: Final = (
+    "0_9",
+    "10_19",
+    "20_29",
+    "30_39",
+    "40_49",
+    "50_59",
+    "60_69",
+    "70_79",
+    "80_89",
+    "90_plus",
+)
+
 ATTR_PUBLISHED: Final = "published"
 ATTR_LOCALLY_ACTIVE: Final = "locally_active"
 ATTR_INTERSTATE_ACTIVE: Final = "interstate_active"
@@ -43,6 +95,20 @@ ATTR_THIS_YEAR_INTERSTATE: Final = "this_year_interstate"
 ATTR_THIS_YEAR_OVERSEAS: Final = "this_year_overseas"
 ATTR_THIS_YEAR_TOTAL: Final = "this_year_total"
 ATTR_THIS_YEAR_TESTS: Final = "this_year_tests"
+ATTR_SINCE_JAN2020_KNOWN: Final = "since_jan2020_known"
+ATTR_SINCE_JAN2020_UNKNOWN: Final = "since_jan2020_unknown"
+ATTR_SINCE_JAN2020_INTERSTATE: Final = "since_jan2020_interstate"
+ATTR_SINCE_JAN2020_OVERSEAS: Final = "since_jan2020_overseas"
+ATTR_SINCE_JAN2020_TOTAL: Final = "since_jan2020_total"
+ATTR_HOSPITALISATIONS_ADMITTED: Final = "hospitalisations_admitted"
+ATTR_HOSPITALISATIONS_ICU: Final = "hospitalisations_icu"
+ATTR_HOSPITALISATIONS_VENTILATION: Final = "hospitalisations_ventilation"
+ATTR_LOCAL_CASES_WITH_KNOWN_SOURCE: Final = "local_cases_with_known_source"
+ATTR_LOCAL_CASES_WITH_UNKNOWN_SOURCE: Final = "local_cases_with_unknown_source"
+ATTR_INTER_STATE_CASES: Final = "inter_state_cases"
+ATTR_OVERSEAS_CASES: Final = "overseas_cases"
+ATTR_TEST_STATS_REPORTING_DATE: Final = "test_stats_reporting_date"
+ATTR_CASE_STATS_REPORTING_DATE: Final = "case_stats_reporting_date"
 ATTR_LAST_24_HOURS_FIRST_DOSE: Final = "last_24_hours_first_dose"
 ATTR_LAST_24_HOURS_SECOND_DOSE: Final = "last_24_hours_second_dose"
 ATTR_LAST_24_HOURS_TOTAL_DOSE: Final = "last_24_hours_total_dose"
@@ -54,7 +120,7 @@ ATTR_LIVES_LOST_FEMALE_0_9: Final = "lives_lost_female_0_9"
 ATTR_LIVES_LOST_FEMALE_10_19: Final = "lives_lost_female_10_19"
 ATTR_LIVES_LOST_FEMALE_20_29: Final = "lives_lost_female_20_29"
 ATTR_LIVES_LOST_FEMALE_30_39: Final = "lives_lost_female_30_39"
-ATTR_LIVES_LOST_FEMALE_40_49: Final = "lives_lost_female_40_59"
+ATTR_LIVES_LOST_FEMALE_40_49: Final = "lives_lost_female_40_49"
 ATTR_LIVES_LOST_FEMALE_50_59: Final = "lives_lost_female_50_59"
 ATTR_LIVES_LOST_FEMALE_60_69: Final = "lives_lost_female_60_69"
 ATTR_LIVES_LOST_FEMALE_70_79: Final = "lives_lost_female_70_79"
@@ -64,7 +130,7 @@ ATTR_LIVES_LOST_MALE_0_9: Final = "lives_lost_male_0_9"
 ATTR_LIVES_LOST_MALE_10_19: Final = "lives_lost_male_10_19"
 ATTR_LIVES_LOST_MALE_20_29: Final = "lives_lost_male_20_29"
 ATTR_LIVES_LOST_MALE_30_39: Final = "lives_lost_male_30_39"
-ATTR_LIVES_LOST_MALE_40_49: Final = "lives_lost_male_40_59"
+ATTR_LIVES_LOST_MALE_40_49: Final = "lives_lost_male_40_49"
 ATTR_LIVES_LOST_MALE_50_59: Final = "lives_lost_male_50_59"
 ATTR_LIVES_LOST_MALE_60_69: Final = "lives_lost_male_60_69"
 ATTR_LIVES_LOST_MALE_70_79: Final = "lives_lost_male_70_79"
@@ -75,7 +141,7 @@ ATTR_CASES_FEMALE_0_9: Final = "cases_female_0_9"
 ATTR_CASES_FEMALE_10_19: Final = "cases_female_10_19"
 ATTR_CASES_FEMALE_20_29: Final = "cases_female_20_29"
 ATTR_CASES_FEMALE_30_39: Final = "cases_female_30_39"
-ATTR_CASES_FEMALE_40_49: Final = "cases_female_40_59"
+ATTR_CASES_FEMALE_40_49: Final = "cases_female_40_49"
 ATTR_CASES_FEMALE_50_59: Final = "cases_female_50_59"
 ATTR_CASES_FEMALE_60_69: Final = "cases_female_60_69"
 ATTR_CASES_FEMALE_70_79: Final = "cases_female_70_79"
@@ -85,7 +151,7 @@ ATTR_CASES_MALE_0_9: Final = "cases_male_0_9"
 ATTR_CASES_MALE_10_19: Final = "cases_male_10_19"
 ATTR_CASES_MALE_20_29: Final = "cases_male_20_29"
 ATTR_CASES_MALE_30_39: Final = "cases_male_30_39"
-ATTR_CASES_MALE_40_49: Final = "cases_male_40_59"
+ATTR_CASES_MALE_40_49: Final = "cases_male_40_49"
 ATTR_CASES_MALE_50_59: Final = "cases_male_50_59"
 ATTR_CASES_MALE_60_69: Final = "cases_male_60_69"
 ATTR_CASES_MALE_70_79: Final = "cases_male_70_79"
@@ -98,6 +164,236 @@ ATTR_GP_NETWORK_DOSES_CUMULATIVE: Final = "gp_network_doses_cumulative"
 ATTR_NSW_HEALTH_DOSES_UPDATED: Final = "nsw_health_doses_updated"
 ATTR_GP_NETWORK_DOSES_UPDATED: Final = "gp_network_doses_updated"
 ATTR_ALL_PROVIDERS_DOSES_CUMULATIVE: Final = "all_providers_doses_cumulative"
+ATTR_LAST_24_HOURS_LOCAL: Final = "last_24_hours_local"
+ATTR_LAST_24_HOURS_LOCAL_SHARE: Final = "last_24_hours_local_share"
+ATTR_THIS_WEEK_LOCAL: Final = "this_week_local"
+ATTR_LAST_WEEK_LOCAL: Final = "last_week_local"
+ATTR_FIRST_DOSE_COVERAGE: Final = "first_dose_coverage"
+ATTR_SECOND_DOSE_COVERAGE: Final = "second_dose_coverage"
+
+# Estimated resident population of NSW used for vaccination coverage
+NSW_POPULATION: Final = 6565651
+
+ACTIVE_SENSORS: Final = [
+    ATTR_PUBLISHED,
+    ATTR_LOCALLY_ACTIVE,
+    ATTR_INTERSTATE_ACTIVE,
+    ATTR_OVERSEAS_ACTIVE,
+    ATTR_TOTAL_ACTIVE,
+    ATTR_HOSPITALISATIONS_ADMITTED,
+    ATTR_HOSPITALISATIONS_ICU,
+    ATTR_HOSPITALISATIONS_VENTILATION,
+    ATTR_LAST_24_HOURS_KNOWN,
+    ATTR_LAST_24_HOURS_UNKNOWN,
+    ATTR_LAST_24_HOURS_INTERSTATE,
+    ATTR_LAST_24_HOURS_OVERSEAS,
+    ATTR_LAST_24_HOURS_TOTAL,
+    ATTR_LAST_24_HOURS_TESTS,
+    ATTR_LOCAL_CASES_WITH_KNOWN_SOURCE,
+    ATTR_LOCAL_CASES_WITH_UNKNOWN_SOURCE,
+    ATTR_INTER_STATE_CASES,
+    ATTR_OVERSEAS_CASES,
+    ATTR_TEST_STATS_REPORTING_DATE,
+    ATTR_CASE_STATS_REPORTING_DATE,
+    ATTR_THIS_WEEK_KNOWN,
+    ATTR_THIS_WEEK_UNKNOWN,
+    ATTR_THIS_WEEK_INTERSTATE,
+    ATTR_THIS_WEEK_OVERSEAS,
+    ATTR_THIS_WEEK_TOTAL,
+    ATTR_THIS_WEEK_TESTS,
+    ATTR_LAST_WEEK_KNOWN,
+    ATTR_LAST_WEEK_UNKNOWN,
+    ATTR_LAST_WEEK_INTERSTATE,
+    ATTR_LAST_WEEK_OVERSEAS,
+    ATTR_LAST_WEEK_TOTAL,
+    ATTR_LAST_WEEK_TESTS,
+    ATTR_THIS_YEAR_KNOWN,
+    ATTR_THIS_YEAR_UNKNOWN,
+    ATTR_THIS_YEAR_INTERSTATE,
+    ATTR_THIS_YEAR_OVERSEAS,
+    ATTR_THIS_YEAR_TOTAL,
+    ATTR_THIS_YEAR_TESTS,
+    ATTR_SINCE_JAN2020_KNOWN,
+    ATTR_SINCE_JAN2020_UNKNOWN,
+    ATTR_SINCE_JAN2020_INTERSTATE,
+    ATTR_SINCE_JAN2020_OVERSEAS,
+    ATTR_SINCE_JAN2020_TOTAL,
+    ATTR_LAST_24_HOURS_FIRST_DOSE,
+    ATTR_LAST_24_HOURS_SECOND_DOSE,
+    ATTR_LAST_24_HOURS_TOTAL_DOSE,
+    ATTR_TOTAL_FIRST_DOSE,
+    ATTR_TOTAL_SECOND_DOSE,
+    ATTR_TOTAL_TOTAL_DOSE,
+    ATTR_LAST_24_HOURS_LOCAL,
+    ATTR_LAST_24_HOURS_LOCAL_SHARE,
+    ATTR_THIS_WEEK_LOCAL,
+    ATTR_LAST_WEEK_LOCAL,
+    ATTR_FIRST_DOSE_COVERAGE,
+    ATTR_SECOND_DOSE_COVERAGE,
+]
+
+# Running counts that only grow, apart from the occasional revision
+CUMULATIVE_STATISTICS: Final = [
+    ATTR_TOTAL_FIRST_DOSE,
+    ATTR_TOTAL_SECOND_DOSE,
+    ATTR_TOTAL_TOTAL_DOSE,
+    ATTR_NSW_HEALTH_DOSES_CUMULATIVE,
+    ATTR_GP_NETWORK_DOSES_CUMULATIVE,
+    ATTR_ALL_PROVIDERS_DOSES_CUMULATIVE,
+]
+
+GROUP_ACTIVE: Final = "active"
+GROUP_LAST_24_HOURS: Final = "last_24_hours"
+GROUP_WEEK: Final = "week"
+GROUP_YEAR: Final = "year"
+GROUP_DOSES: Final = "doses"
+GROUP_AGE_SEX: Final = "age_sex"
+
+GROUP_NAMES: Final = {
+    GROUP_ACTIVE: "Active cases",
+    GROUP_LAST_24_HOURS: "Last 24 hours",
+    GROUP_WEEK: "This week and last week",
+    GROUP_YEAR: "Since January 2020",
+    GROUP_DOSES: "Vaccinations",
+    GROUP_AGE_SEX: "Cases and lives lost by age and sex",
+}
+
+# Statistics tracked for each group, the published timestamp always is
+GROUPS: Final = {
+    GROUP_ACTIVE: [
+        ATTR_LOCALLY_ACTIVE,
+        ATTR_INTERSTATE_ACTIVE,
+        ATTR_OVERSEAS_ACTIVE,
+        ATTR_TOTAL_ACTIVE,
+        ATTR_HOSPITALISATIONS_ADMITTED,
+        ATTR_HOSPITALISATIONS_ICU,
+        ATTR_HOSPITALISATIONS_VENTILATION,
+    ],
+    GROUP_LAST_24_HOURS: [
+        ATTR_LAST_24_HOURS_KNOWN,
+        ATTR_LAST_24_HOURS_UNKNOWN,
+        ATTR_LAST_24_HOURS_INTERSTATE,
+        ATTR_LAST_24_HOURS_OVERSEAS,
+        ATTR_LAST_24_HOURS_TOTAL,
+        ATTR_LAST_24_HOURS_TESTS,
+        ATTR_LAST_24_HOURS_LOCAL,
+        ATTR_LAST_24_HOURS_LOCAL_SHARE,
+        ATTR_LOCAL_CASES_WITH_KNOWN_SOURCE,
+        ATTR_LOCAL_CASES_WITH_UNKNOWN_SOURCE,
+        ATTR_INTER_STATE_CASES,
+        ATTR_OVERSEAS_CASES,
+        ATTR_TEST_STATS_REPORTING_DATE,
+        ATTR_CASE_STATS_REPORTING_DATE,
+    ],
+    GROUP_WEEK: [
+        ATTR_THIS_WEEK_KNOWN,
+        ATTR_THIS_WEEK_UNKNOWN,
+        ATTR_THIS_WEEK_INTERSTATE,
+        ATTR_THIS_WEEK_OVERSEAS,
+        ATTR_THIS_WEEK_TOTAL,
+        ATTR_THIS_WEEK_TESTS,
+        ATTR_THIS_WEEK_LOCAL,
+        ATTR_LAST_WEEK_KNOWN,
+        ATTR_LAST_WEEK_UNKNOWN,
+        ATTR_LAST_WEEK_INTERSTATE,
+        ATTR_LAST_WEEK_OVERSEAS,
+        ATTR_LAST_WEEK_TOTAL,
+        ATTR_LAST_WEEK_TESTS,
+        ATTR_LAST_WEEK_LOCAL,
+    ],
+    GROUP_YEAR: [
+        ATTR_THIS_YEAR_KNOWN,
+        ATTR_THIS_YEAR_UNKNOWN,
+        ATTR_THIS_YEAR_INTERSTATE,
+        ATTR_THIS_YEAR_OVERSEAS,
+        ATTR_THIS_YEAR_TOTAL,
+        ATTR_THIS_YEAR_TESTS,
+        ATTR_SINCE_JAN2020_KNOWN,
+        ATTR_SINCE_JAN2020_UNKNOWN,
+        ATTR_SINCE_JAN2020_INTERSTATE,
+        ATTR_SINCE_JAN2020_OVERSEAS,
+        ATTR_SINCE_JAN2020_TOTAL,
+    ],
+    GROUP_DOSES: [
+        ATTR_LAST_24_HOURS_FIRST_DOSE,
+        ATTR_LAST_24_HOURS_SECOND_DOSE,
+        ATTR_LAST_24_HOURS_TOTAL_DOSE,
+        ATTR_TOTAL_FIRST_DOSE,
+        ATTR_TOTAL_SECOND_DOSE,
+        ATTR_TOTAL_TOTAL_DOSE,
+        ATTR_FIRST_DOSE_COVERAGE,
+        ATTR_SECOND_DOSE_COVERAGE,
+        ATTR_NSW_HEALTH_DOSES_DAILY,
+        ATTR_NSW_HEALTH_DOSES_CUMULATIVE,
+        ATTR_GP_NETWORK_DOSES_CUMULATIVE,
+        ATTR_NSW_HEALTH_DOSES_UPDATED,
+        ATTR_GP_NETWORK_DOSES_UPDATED,
+        ATTR_ALL_PROVIDERS_DOSES_CUMULATIVE,
+    ],
+    GROUP_AGE_SEX: [
+        f"{measure}_{sex}_{age}"
+        for measure in (ATTR_CASES, ATTR_LIVES_LOST)
+        for sex in SEXES
+        for age in AGE_GROUPS
+    ],
+}
+
+# Structured dataset columns that are not named after the statistic they hold,
+# keyed by the column name lower cased with anything else replaced by "_"
+OPEN_DATA_COLUMNS: Final = {
+    "date": ATTR_PUBLISHED,
+    "reporting_date": ATTR_PUBLISHED,
+    "notification_date": ATTR_PUBLISHED,
+    "new_cases": ATTR_LAST_24_HOURS_TOTAL,
+    "cases_last_24_hours": ATTR_LAST_24_HOURS_TOTAL,
+    "active_cases": ATTR_LOCALLY_ACTIVE,
+    "doses_last_24_hours": ATTR_LAST_24_HOURS_TOTAL_DOSE,
+    "first_doses": ATTR_TOTAL_FIRST_DOSE,
+    "second_doses": ATTR_TOTAL_SECOND_DOSE,
+    "total_doses": ATTR_TOTAL_TOTAL_DOSE,
+}
+
+TREND_SENSORS: Final = [
+    ATTR_LOCALLY_ACTIVE,
+    ATTR_LAST_24_HOURS_TOTAL,
+    ATTR_LAST_24_HOURS_TOTAL_DOSE,
+]
+
+TREND_AVERAGE: Final = "7_day_average"
+TREND_DAY_OVER_DAY: Final = "day_over_day"
+TREND_WEEK_OVER_WEEK: Final = "week_over_week"
+
+# Entities are grouped under a device for NSW Health with one per subject below
+# it, entities not listed here are case sources
+DEVICE_NSWHEALTH: Final = "nsw_health"
+DEVICE_ACTIVE: Final = "active_cases"
+DEVICE_SOURCES: Final = "case_sources"
+DEVICE_TESTING: Final = "testing"
+DEVICE_VACCINATION: Final = "vaccination"
+DEVICE_DEMOGRAPHICS: Final = "demographics"
+
+DEVICE_NAMES: Final = {
+    DEVICE_NSWHEALTH: NSWHEALTH_NAME,
+    DEVICE_ACTIVE: f"{NSWHEALTH_NAME} Active Cases",
+    DEVICE_SOURCES: f"{NSWHEALTH_NAME} Case Sources",
+    DEVICE_TESTING: f"{NSWHEALTH_NAME} Testing",
+    DEVICE_VACCINATION: f"{NSWHEALTH_NAME} Vaccination",
+    DEVICE_DEMOGRAPHICS: f"{NSWHEALTH_NAME} Demographics",
+}
+
+DEVICE_STATISTICS: Final = {
+    DEVICE_NSWHEALTH: [ATTR_PUBLISHED],
+    DEVICE_ACTIVE: GROUPS[GROUP_ACTIVE],
+    DEVICE_TESTING: [
+        ATTR_LAST_24_HOURS_TESTS,
+        ATTR_THIS_WEEK_TESTS,
+        ATTR_LAST_WEEK_TESTS,
+        ATTR_THIS_YEAR_TESTS,
+        ATTR_TEST_STATS_REPORTING_DATE,
+    ],
+    DEVICE_VACCINATION: [ATTR_DOSES, *GROUPS[GROUP_DOSES]],
+    DEVICE_DEMOGRAPHICS: [ATTR_CASES, ATTR_LIVES_LOST],
+}
 
 DEVICE_CLASS_COVID_CASES: Final = "covid_cases"
 DEVICE_CLASS_COVID_VACCINATIONS: Final = "covid_vaccinations"
@@ -0,0 +1,237 @@
+"""Per config entry ownership of the NSW Covid tracker and its resources."""
+import asyncio
+import logging
+
+from homeassistant.components.sensor import DOMAIN as SENSOR
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_registry
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    ACTIVE_SENSORS,
+    ATTR_PUBLISHED,
+    CONF_GROUPS,
+    CONF_OPEN_DATA_URL,
+    CONF_SNAPSHOT_URL,
+    DOMAIN,
+    GROUPS,
+    HISTORY_STORAGE_VERSION,
+    SNAPSHOT_SAVE_DELAY,
+    SNAPSHOT_STORAGE_VERSION,
+)
+from .history import PublicationHistory
+from .longterm import async_import_statistics, breakdown_rows
+from .tracker import StatisticTracker
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class NSWCovidCoordinator:
+    """Own the tracker, its polling task, listeners and entities for one entry.
+
+    Everything started for the entry is registered here so that unloading
+    the entry tears it all down, and a reload starts from a clean slate.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry):
+        """Set up the coordinator and its tracker."""
+        self.__hass = hass
+        self.__entry = entry
+        self.__store = Store(
+            hass, SNAPSHOT_STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}"
+        )
+        self.__groups = tuple(entry.options.get(CONF_GROUPS, GROUPS))
+        self.__tracker = StatisticTracker(
+            hass.loop,
+            async_get_clientsession(hass),
+            self.__store,
+            [
+                statistic_id
+                for group in self.__groups
+                for statistic_id in GROUPS.get(group, ())
+            ],
+            entry.options.get(CONF_SNAPSHOT_URL, entry.data.get(CONF_SNAPSHOT_URL))
+            or None,
+            entry.options.get(CONF_OPEN_DATA_URL) or None,
+        )
+        self.__history_store = Store(
+            hass, HISTORY_STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.history"
+        )
+        self.__history = PublicationHistory(
+            statistic_id
+            for statistic_id in ACTIVE_SENSORS
+            if statistic_id in self.__tracker.statistics
+            and self.__tracker.statistics[statistic_id].typeName in ("integer", "float")
+        )
+        self.__listeners = []
+        self.__unsubscribe = []
+        self.__entities = {}
+        self.__watching = False
+        self.__task = None
+
+    @property
+    def entry(self):
+        """Return the config entry being coordinated."""
+        return self.__entry
+
+    @property
+    def groups(self):
+        """Return the groups of statistics selected for the entry."""
+        return self.__groups
+
+    @property
+    def tracker(self):
+        """Return the statistic tracker."""
+        return self.__tracker
+
+    @property
+    def history(self):
+        """Return the per publication history of the statistics."""
+        return self.__history
+
+    @property
+    def entities(self):
+        """Return the entities created for the entry keyed by unique id."""
+        return self.__entities
+
+    @property
+    def suppressed_writes(self):
+        """Return how many unchanged state writes the entities have dropped."""
+        return sum(
+            getattr(entity, "suppressed_writes", 0)
+            for entity in self.__entities.values()
+        )
+
+    @property
+    def running(self):
+        """Return True while the polling task is running."""
+        return self.__task is not None and not self.__task.done()
+
+    async def async_restore(self):
+        """Load the last snapshots, returns True if any statistics were restored."""
+        restored = self.__tracker.restore(await self.__store.async_load())
+        self.__history.restore(await self.__history_store.async_load())
+        self.__unsubscribe.append(
+            self.__tracker.router.subscribe(
+                (ATTR_PUBLISHED, *self.__history.statistic_ids), self
+            )
+        )
+        return restored
+
+    def async_device_changed(self):
+        """Record the statistics in the history once a refresh has changed them."""
+        published = self.__tracker.published
+        if published is None:
+            return
+        day = published.date()
+        statistics = self.__tracker.statistics
+        enabled = self.__tracker.enabled
+        if enabled is not None:
+            # Disabled statistics hold stale values, record them as missing
+            statistics = {
+                statistic_id: statistic
+                for statistic_id, statistic in statistics.items()
+                if statistic_id in enabled
+            }
+        if self.__history.record(day, statistics):
+            self.__history_store.async_delay_save(
+                self.__history.snapshot, SNAPSHOT_SAVE_DELAY
+            )
+            self.__history.notify()
+            async_import_statistics(
+                self.__hass, statistics, breakdown_rows(day, statistics)
+            )
+
+    def add_listener(self, event_listener):
+        """Add a tracker listener that is removed when the entry unloads."""
+        self.__tracker.addListener(event_listener)
+        self.__listeners.append(event_listener)
+        return event_listener
+
+    def add_entities(self, entities):
+        """Keep references to the entities created for the entry.
+
+        Only the statistics read by entities enabled in the entity registry
+        are refreshed from then on, following the registry as entities are
+        enabled and disabled.
+        """
+        for entity in entities:
+            self.__entities[entity.unique_id] = entity
+        self.async_update_enabled()
+        if not self.__watching:
+            self.__watching = True
+            self.__unsubscribe.append(
+                self.__hass.bus.async_listen(
+                    entity_registry.EVENT_ENTITY_REGISTRY_UPDATED,
+                    self.__registry_updated,
+                    event_filter=self.__owns_change,
+                )
+            )
+
+    @callback
+    def async_update_enabled(self):
+        """Refresh only the statistics that enabled entities read."""
+        registry = entity_registry.async_get(self.__hass)
+        statistic_ids = set()
+        for unique_id, entity in self.__entities.items():
+            entity_id = registry.async_get_entity_id(SENSOR, DOMAIN, unique_id)
+            registered = registry.async_get(entity_id) if entity_id else None
+            if registered is None:
+                enabled = entity.entity_registry_enabled_default
+            else:
+                enabled = not registered.disabled
+            if enabled:
+                statistic_ids.update(getattr(entity, "statistic_ids", ()))
+        self.__tracker.enable(statistic_ids)
+
+    @callback
+    def __owns_change(self, event):
+        """Return True for registry changes enabling or disabling our entities."""
+        # The filter is passed the event before Home Assistant 2024.4, its data since
+        data = getattr(event, "data", event)
+        if data.get("action") == "update" and "disabled_by" not in (
+            data.get("changes") or ()
+        ):
+            return False
+        registered = entity_registry.async_get(self.__hass).async_get(
+            data.get("entity_id")
+        )
+        if registered is not None:
+            return registered.config_entry_id == self.__entry.entry_id
+        # Removed from the registry, the entity may still be ours
+        return data.get("entity_id") in {
+            entity.entity_id for entity in self.__entities.values()
+        }
+
+    @callback
+    def __registry_updated(self, event):
+        self.async_update_enabled()
+
+    def start(self, scheduler):
+        """Start polling on the scheduler, replacing any running task."""
+        if self.running:
+            _LOGGER.debug("Replacing running tracker for %s", self.__entry.entry_id)
+            self.__task.cancel()
+        self.__task = self.__tracker.track(scheduler)
+        return self.__task
+
+    async def async_shutdown(self):
+        """Stop polling and release everything registered for the entry."""
+        task, self.__task = self.__task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        for event_listener in self.__listeners:
+            self.__tracker.removeListener(event_listener)
+        self.__listeners.clear()
+        for unsubscribe in self.__unsubscribe:
+            unsubscribe()
+        self.__unsubscribe.clear()
+        self.__watching = False
+        self.__entities.clear()
+        _LOGGER.debug("Shut down tracker for %s", self.__entry.entry_id)
@@ -0,0 +1,233 @@
+"""Statistics derived from the statistics NSW Health publishes."""
+import logging
+
+from .const import (
+    ATTR_FIRST_DOSE_COVERAGE,
+    ATTR_LAST_24_HOURS_INTERSTATE,
+    ATTR_LAST_24_HOURS_LOCAL,
+    ATTR_LAST_24_HOURS_LOCAL_SHARE,
+    ATTR_LAST_24_HOURS_OVERSEAS,
+    ATTR_LAST_24_HOURS_TOTAL,
+    ATTR_LAST_WEEK_INTERSTATE,
+    ATTR_LAST_WEEK_LOCAL,
+    ATTR_LAST_WEEK_OVERSEAS,
+    ATTR_LAST_WEEK_TOTAL,
+    ATTR_SECOND_DOSE_COVERAGE,
+    ATTR_THIS_WEEK_INTERSTATE,
+    ATTR_THIS_WEEK_LOCAL,
+    ATTR_THIS_WEEK_OVERSEAS,
+    ATTR_THIS_WEEK_TOTAL,
+    ATTR_TOTAL_FIRST_DOSE,
+    ATTR_TOTAL_SECOND_DOSE,
+    NSW_POPULATION,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def local(total, interstate, overseas):
+    """Cases acquired in NSW."""
+    return total - interstate - overseas
+
+
+def share(part, whole):
+    """Percentage of whole that part makes up."""
+    return round(part / whole * 100, 2)
+
+
+def coverage(doses):
+    """Percentage of the NSW population who have had a dose."""
+    return round(doses / NSW_POPULATION * 100, 2)
+
+
+# Described the same way as the published statistics, plus the statistics
+# each is calculated from and the function that calculates it.
+DERIVED_STATISTICS = {
+    ATTR_LAST_24_HOURS_LOCAL: {
+        "name": "Last 24 Hours Local",
+        "type": "integer",
+        "unit": "case",
+        "iconId": "mdi:virus",
+        "measurement": True,
+        "inputs": (
+            ATTR_LAST_24_HOURS_TOTAL,
+            ATTR_LAST_24_HOURS_INTERSTATE,
+            ATTR_LAST_24_HOURS_OVERSEAS,
+        ),
+        "formula": local,
+    },
+    ATTR_LAST_24_HOURS_LOCAL_SHARE: {
+        "name": "Last 24 Hours Locally Acquired",
+        "type": "float",
+        "unit": "%",
+        "iconId": "mdi:virus",
+        "measurement": True,
+        "inputs": (ATTR_LAST_24_HOURS_LOCAL, ATTR_LAST_24_HOURS_TOTAL),
+        "formula": share,
+    },
+    ATTR_THIS_WEEK_LOCAL: {
+        "name": "This Week Local",
+        "type": "integer",
+        "unit": "case",
+        "iconId": "mdi:virus",
+        "measurement": True,
+        "inputs": (
+            ATTR_THIS_WEEK_TOTAL,
+            ATTR_THIS_WEEK_INTERSTATE,
+            ATTR_THIS_WEEK_OVERSEAS,
+        ),
+        "formula": local,
+    },
+    ATTR_LAST_WEEK_LOCAL: {
+        "name": "Last Week Local",
+        "type": "integer",
+        "unit": "case",
+        "iconId": "mdi:virus",
+        "measurement": True,
+        "inputs": (
+            ATTR_LAST_WEEK_TOTAL,
+            ATTR_LAST_WEEK_INTERSTATE,
+            ATTR_LAST_WEEK_OVERSEAS,
+        ),
+        "formula": local,
+    },
+    ATTR_FIRST_DOSE_COVERAGE: {
+        "name": "First Dose Coverage",
+        "type": "float",
+        "unit": "%",
+        "iconId": "mdi:needle",
+        "measurement": True,
+        "inputs": (ATTR_TOTAL_FIRST_DOSE,),
+        "formula": coverage,
+    },
+    ATTR_SECOND_DOSE_COVERAGE: {
+        "name": "Second Dose Coverage",
+        "type": "float",
+        "unit": "%",
+        "iconId": "mdi:needle",
+        "measurement": True,
+        "inputs": (ATTR_TOTAL_SECOND_DOSE,),
+        "formula": coverage,
+    },
+}
+
+
+class DerivedGraph:
+    """Recalculate derived statistics when, and only when, an input changes.
+
+    The definitions are compiled once into derived Statistic objects and an
+    index of input id to the derived statistics that read it. Derived values
+    are set like any other statistic, so their own change events reach the
+    router, and any statistic derived from them, in the usual way.
+    """
+
+    def __init__(self, handler, statistics, event_listeners, definitions=None):
+        """Compile definitions against the published statistics."""
+        from nswcovid.protocol.statistics import Statistic
+
+        definitions = DERIVED_STATISTICS if definitions is None else definitions
+        self.__statistics = {}
+        self.__formulas = {}
+        self.__inputs = {}
+        self.__dependents = {}
+        for statistic_id in self.__order(definitions, statistics):
+            data = definitions[statistic_id]
+            self.__statistics[statistic_id] = Statistic(
+                handler=handler,
+                id=statistic_id,
+                data=data,
+                event_listeners=event_listeners,
+            )
+            self.__formulas[statistic_id] = data["formula"]
+            self.__inputs[statistic_id] = tuple(data["inputs"])
+            for input_id in data["inputs"]:
+                self.__dependents.setdefault(input_id, []).append(statistic_id)
+        self.__available = {**statistics, **self.__statistics}
+        self.__enabled = None
+
+    @staticmethod
+    def __order(definitions, statistics):
+        """Return the derived ids inputs first, dropping unresolvable ones."""
+        ordered = []
+        visiting = set()
+
+        def visit(statistic_id):
+            if statistic_id in ordered:
+                return True
+            if statistic_id in visiting:
+                _LOGGER.error("%s depends on itself", statistic_id)
+                return False
+            visiting.add(statistic_id)
+            resolved = True
+            for input_id in definitions[statistic_id]["inputs"]:
+                if input_id in definitions:
+                    resolved = visit(input_id) and resolved
+                elif input_id not in statistics:
+                    _LOGGER.error("%s needs unknown input %s", statistic_id, input_id)
+                    resolved = False
+            visiting.discard(statistic_id)
+            if resolved:
+                ordered.append(statistic_id)
+            return resolved
+
+        for statistic_id in definitions:
+            visit(statistic_id)
+        return ordered
+
+    @property
+    def statistics(self):
+        """Return the derived statistics keyed by id."""
+        return self.__statistics
+
+    def inputs(self, statistic_id):
+        """Return the ids a derived statistic is calculated from."""
+        return self.__inputs.get(statistic_id, ())
+
+    def dependents(self, statistic_ids):
+        """Return the derived ids calculated, directly or not, from statistic_ids."""
+        found = []
+        pending = list(statistic_ids)
+        while pending:
+            for statistic_id in self.__dependents.get(pending.pop(), ()):
+                if statistic_id not in found:
+                    found.append(statistic_id)
+                    pending.append(statistic_id)
+        return found
+
+    def enable(self, statistic_ids):
+        """Only recalculate the statistics in statistic_ids, or all when None."""
+        self.__enabled = statistic_ids
+
+    def calculate(self, statistic_id):
+        """Return the current value of a derived statistic, None if it cannot be."""
+        values = []
+        for input_id in self.__inputs[statistic_id]:
+            value = self.__available[input_id].status
+            if value is None:
+                return None
+            values.append(value)
+        try:
+            return self.__formulas[statistic_id](*values)
+        except (ArithmeticError, TypeError, ValueError) as err:
+            _LOGGER.debug("Unable to calculate %s: %s", statistic_id, err)
+            return None
+
+    def recalculate(self):
+        """Recalculate every derived statistic, inputs first."""
+        for statistic_id, statistic in self.__statistics.items():
+            statistic.status = self.calculate(statistic_id)
+
+    def dispatch(self, payload):
+        """Recalculate the statistics derived from the payload's statistic."""
+        if getattr(payload, "event_type", None) != "statistic_updated":
+            return None
+        dependents = self.__dependents.get(payload.id)
+        if not dependents:
+            return None
+        for statistic_id in dependents:
+            if self.__enabled is not None and statistic_id not in self.__enabled:
+                continue
+            statistic = self.__statistics[statistic_id]
+            statistic.updated = payload.ts
+            statistic.status = self.calculate(statistic_id)
+        return True
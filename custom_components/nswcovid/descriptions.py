@@ -0,0 +1,98 @@
+"""How NSW Covid statistics are presented as sensors, resolved once each.
+
+The tables below describe every statistic by its type and unit. describe()
+resolves them for a statistic when its entity is created, so the properties
+Home Assistant reads on every write are attribute lookups.
+"""
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from .const import CUMULATIVE_STATISTICS, NSWHEALTH_NAME, TIMESTAMP_TYPES
+
+try:
+    from homeassistant.components.sensor import SensorStateClass
+
+    STATE_CLASS_MEASUREMENT = SensorStateClass.MEASUREMENT
+    STATE_CLASS_RESETTING = SensorStateClass.TOTAL_INCREASING
+    # Revisable running counts, total_increasing would read a revision as a reset
+    STATE_CLASS_CUMULATIVE = SensorStateClass.TOTAL
+except ImportError:
+    # Before Home Assistant 2021.12, which has no total state class either
+    STATE_CLASS_MEASUREMENT = "measurement"
+    STATE_CLASS_RESETTING = "total_increasing"
+    STATE_CLASS_CUMULATIVE = STATE_CLASS_RESETTING
+
+DEFAULT_ICON = "mdi:virus-outline"
+
+# Units as the statistics library names them, and as they are shown
+UNITS = {
+    "case": "cases",
+    "death": "deaths",
+    "dose": "doses",
+    "test": "tests",
+}
+
+
+def _isoformat(status):
+    return status.isoformat()
+
+
+def _unchanged(status):
+    return status
+
+
+# Unit, device class and state conversion by statistic type
+TYPES = {
+    **{
+        type_name: ("ISO8601", "timestamp", _isoformat) for type_name in TIMESTAMP_TYPES
+    },
+    "integer": (None, None, int),
+    "float": (None, None, float),
+}
+UNTYPED = (None, None, _unchanged)
+
+
+@dataclass(frozen=True)
+class StatisticDescription:
+    """The presentation of a statistic as a sensor."""
+
+    key: str
+    name: Optional[str]
+    icon: str
+    unit: Optional[str]
+    device_class: Optional[str]
+    state_class: Optional[str]
+    convert: Callable[[Any], Any]
+
+    def state(self, status):
+        """Return the state of a statistic with status, None when it has none."""
+        if not status:
+            return None
+        return self.convert(status)
+
+
+def describe(statistic):
+    """Return the description of a statistic."""
+    unit, device_class, convert = TYPES.get(statistic.typeName, UNTYPED)
+    if unit is None:
+        unit = UNITS.get(statistic.unit, statistic.unit)
+    return StatisticDescription(
+        key=statistic.id,
+        name=f"{NSWHEALTH_NAME} {statistic.name}" if statistic.name else None,
+        icon=getattr(statistic, "iconId", None) or DEFAULT_ICON,
+        unit=unit,
+        device_class=device_class,
+        state_class=_state_class(statistic),
+        convert=convert,
+    )
+
+
+def _state_class(statistic):
+    """Return the state class of a statistic."""
+    if statistic.id in CUMULATIVE_STATISTICS:
+        return STATE_CLASS_CUMULATIVE
+    if not getattr(statistic, "measurement", False):
+        return None
+    if getattr(statistic, "resetting", False):
+        return STATE_CLASS_RESETTING
+    return STATE_CLASS_MEASUREMENT
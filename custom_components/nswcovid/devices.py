@@ -0,0 +1,91 @@
+"""The devices NSW Covid entities are grouped under."""
+import logging
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import device_registry, entity_registry
+
+from .const import (
+    DEVICE_NAMES,
+    DEVICE_NSWHEALTH,
+    DEVICE_SOURCES,
+    DEVICE_STATISTICS,
+    DOMAIN,
+    MANUFACTURER,
+    TREND_AVERAGE,
+    TREND_DAY_OVER_DAY,
+    TREND_WEEK_OVER_WEEK,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+DEVICE_OF = {
+    unique_id: device
+    for device, unique_ids in DEVICE_STATISTICS.items()
+    for unique_id in unique_ids
+}
+
+TREND_SUFFIXES = tuple(
+    f"_{trend}" for trend in (TREND_AVERAGE, TREND_DAY_OVER_DAY, TREND_WEEK_OVER_WEEK)
+)
+
+
+def device_of(unique_id):
+    """Return the device the entity with unique_id belongs to."""
+    if unique_id.startswith("diagnostic_"):
+        return DEVICE_NSWHEALTH
+    # Trends sit with the statistic they follow
+    for suffix in TREND_SUFFIXES:
+        if unique_id.endswith(suffix):
+            unique_id = unique_id[: -len(suffix)]
+            break
+    return DEVICE_OF.get(unique_id, DEVICE_SOURCES)
+
+
+def device_info(device):
+    """Return the device_info of a device."""
+    info = {
+        "identifiers": {(DOMAIN, device)},
+        "name": DEVICE_NAMES[device],
+        "manufacturer": MANUFACTURER,
+    }
+    if device != DEVICE_NSWHEALTH:
+        info["via_device"] = (DOMAIN, DEVICE_NSWHEALTH)
+    return info
+
+
+@callback
+def async_migrate_devices(hass: HomeAssistant, entry: ConfigEntry):
+    """Move entities from a device of their own onto the shared devices.
+
+    Entity ids are kept, and the devices left empty are removed. Returns the
+    number of entities moved.
+    """
+    devices = device_registry.async_get(hass)
+    entities = entity_registry.async_get(hass)
+    created = {}
+
+    def device_id(device):
+        if device not in created:
+            created[device] = devices.async_get_or_create(
+                config_entry_id=entry.entry_id, **device_info(device)
+            ).id
+        return created[device]
+
+    # The NSW Health device has to exist before any device below it
+    device_id(DEVICE_NSWHEALTH)
+    moved = 0
+    for entity in entity_registry.async_entries_for_config_entry(
+        entities, entry.entry_id
+    ):
+        target = device_id(device_of(entity.unique_id))
+        if entity.device_id != target:
+            entities.async_update_entity(entity.entity_id, device_id=target)
+            moved += 1
+    for device in device_registry.async_entries_for_config_entry(
+        devices, entry.entry_id
+    ):
+        if device.id not in created.values():
+            devices.async_remove_device(device.id)
+    _LOGGER.debug("Moved %d entities onto %d devices", moved, len(created))
+    return moved
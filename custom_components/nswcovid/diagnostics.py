@@ -0,0 +1,39 @@
+"""Diagnostics for NSW Covid."""
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry):
+    """Return where recent refreshes spent their time, and the polling state."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    tracker = coordinator.tracker
+    return {
+        "running": coordinator.running,
+        "failed": tracker.failed,
+        "publication_failed": tracker.publication_failed,
+        "published": tracker.published.isoformat() if tracker.published else None,
+        "suppressed_writes": coordinator.suppressed_writes,
+        "history_days": len(coordinator.history.days),
+        "enabled_statistics": (
+            sorted(tracker.enabled) if tracker.enabled is not None else None
+        ),
+        "metrics": tracker.metrics.as_dict(),
+        "sources": [
+            {
+                "url": source.url,
+                "statistics": len(source.statistics),
+                "active": len(source.active),
+                "available": source.available,
+                "streaming": source.streaming,
+                "etag": source.etag,
+                "last_modified": source.last_modified,
+                "digest": source.digest,
+                "received": source.received,
+                "fetch_ms": round(source.fetch_time * 1000, 1),
+                "parse_ms": round(source.parse_time * 1000, 1),
+            }
+            for source in tracker.sources
+        ],
+    }
@@ -0,0 +1,203 @@
+"""Bounded per publication history of NSW Covid statistics."""
+from collections import deque
+from datetime import date
+import logging
+
+from .const import HISTORY_SIZE, ROLLING_WINDOW
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class Series:
+    """A ring buffer of one statistic's values, one per publication.
+
+    Sums over the latest window and the window before it are kept as values
+    are added, so averages and growth never rescan the buffer.
+    """
+
+    __slots__ = ("__values", "__window", "__sums", "__counts")
+
+    def __init__(self, size=HISTORY_SIZE, window=ROLLING_WINDOW):
+        """Set up an empty series."""
+        self.__values = deque(maxlen=max(size, window * 2))
+        self.__window = window
+        self.__sums = [0, 0]
+        self.__counts = [0, 0]
+
+    def __len__(self):
+        return len(self.__values)
+
+    @property
+    def values(self):
+        """Return the recorded values, oldest first."""
+        return list(self.__values)
+
+    def __move(self, value, window, direction):
+        if value is None:
+            return
+        self.__sums[window] += value * direction
+        self.__counts[window] += direction
+
+    def append(self, value):
+        """Add the value for a new publication."""
+        values = self.__values
+        if len(values) >= self.__window:
+            leaving = values[-self.__window]
+            self.__move(leaving, 0, -1)
+            self.__move(leaving, 1, 1)
+        if len(values) >= self.__window * 2:
+            self.__move(values[-self.__window * 2], 1, -1)
+        values.append(value)
+        self.__move(value, 0, 1)
+
+    def replace(self, value):
+        """Replace the value for the latest publication."""
+        if not self.__values:
+            self.append(value)
+            return
+        self.__move(self.__values[-1], 0, -1)
+        self.__values[-1] = value
+        self.__move(value, 0, 1)
+
+    @property
+    def latest(self):
+        """Return the latest value."""
+        return self.__values[-1] if self.__values else None
+
+    @property
+    def average(self):
+        """Return the mean over the latest window."""
+        if not self.__counts[0]:
+            return None
+        return self.__sums[0] / self.__counts[0]
+
+    @property
+    def delta(self):
+        """Return the change since the previous publication."""
+        if len(self.__values) < 2:
+            return None
+        latest, previous = self.__values[-1], self.__values[-2]
+        if latest is None or previous is None:
+            return None
+        return latest - previous
+
+    @property
+    def growth(self):
+        """Return the percentage change of the latest window over the one before."""
+        if self.__counts[0] < self.__window or self.__counts[1] < self.__window:
+            return None
+        if not self.__sums[1]:
+            return None
+        return (self.__sums[0] - self.__sums[1]) / self.__sums[1] * 100
+
+
+class PublicationHistory:
+    """Record numeric statistics once per publication day."""
+
+    def __init__(self, statistic_ids, size=HISTORY_SIZE, window=ROLLING_WINDOW):
+        """Set up empty series for statistic_ids."""
+        self.__size = size
+        self.__window = window
+        self.__days = deque(maxlen=max(size, window * 2))
+        self.__series = {
+            statistic_id: Series(size, window) for statistic_id in statistic_ids
+        }
+        self.__listeners = {}
+
+    @property
+    def days(self):
+        """Return the publication days recorded, oldest first."""
+        return list(self.__days)
+
+    @property
+    def statistic_ids(self):
+        """Return the ids of the statistics recorded."""
+        return tuple(self.__series)
+
+    def series(self, statistic_id):
+        """Return the series for a statistic, None if it is not recorded."""
+        return self.__series.get(statistic_id)
+
+    def record(self, day, statistics):
+        """Record the current statistics for a publication day, returns True if any changed."""
+        if day is None:
+            return False
+        new_day = not self.__days or self.__days[-1] != day
+        if not new_day:
+            changed = False
+            for statistic_id, series in self.__series.items():
+                value = _value(statistics.get(statistic_id))
+                if series.latest != value:
+                    series.replace(value)
+                    changed = True
+            return changed
+        if self.__days and day < self.__days[-1]:
+            _LOGGER.debug(
+                "Ignoring publication for %s, already have %s", day, self.__days[-1]
+            )
+            return False
+        self.__days.append(day)
+        for statistic_id, series in self.__series.items():
+            series.append(_value(statistics.get(statistic_id)))
+        return True
+
+    def subscribe(self, entity):
+        """Advise entity whenever the history changes, returns an unsubscribe callback."""
+        self.__listeners[entity] = True
+
+        def unsubscribe():
+            self.__listeners.pop(entity, None)
+
+        return unsubscribe
+
+    def notify(self):
+        """Advise every subscribed entity that the history changed."""
+        for entity in list(self.__listeners):
+            try:
+                entity.async_device_changed()
+            except Exception as err:
+                _LOGGER.error("Unable to send %s update to HA", entity.entity_id)
+                _LOGGER.exception(err)
+
+    def snapshot(self):
+        """Return the history in a compact form for storage."""
+        return {
+            "days": [day.toordinal() for day in self.__days],
+            "values": {
+                statistic_id: series.values
+                for statistic_id, series in self.__series.items()
+            },
+        }
+
+    def restore(self, snapshot):
+        """Rebuild the history from a stored snapshot, returns True if it was."""
+        if not snapshot:
+            return False
+        try:
+            days = [date.fromordinal(day) for day in snapshot["days"]]
+            stored = snapshot["values"]
+        except (KeyError, TypeError, ValueError) as err:
+            _LOGGER.warning("Unable to restore history: %s", err)
+            return False
+        self.__days.clear()
+        self.__series = {
+            statistic_id: Series(self.__size, self.__window)
+            for statistic_id in self.__series
+        }
+        for index, day in enumerate(days):
+            self.__days.append(day)
+            for statistic_id, series in self.__series.items():
+                values = stored.get(statistic_id) or []
+                # Series recorded since the snapshot was taken start out empty
+                offset = index - (len(days) - len(values))
+                series.append(values[offset] if offset >= 0 else None)
+        _LOGGER.debug("Restored %d days of history", len(days))
+        return True
+
+
+def _value(statistic):
+    """Return a statistic's numeric value, or None."""
+    status = getattr(statistic, "status", None)
+    if isinstance(status, bool) or not isinstance(status, (int, float)):
+        return None
+    return status
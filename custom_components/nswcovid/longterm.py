@@ -0,0 +1,207 @@
+"""Feed NSW Covid statistics to Home Assistant long-term statistics."""
+from datetime import date, datetime, time
+import logging
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from .buckets import layout
+from .const import (
+    ATTR_CASES,
+    ATTR_LIVES_LOST,
+    CUMULATIVE_STATISTICS,
+    DOMAIN,
+    NSWHEALTH_TIMEZONE,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+TZ = dt_util.get_time_zone(NSWHEALTH_TIMEZONE)
+
+BREAKDOWNS = (ATTR_CASES, ATTR_LIVES_LOST)
+
+UNITS = {"case": "cases", "death": "deaths", "dose": "doses", "test": "tests"}
+
+KIND_CUMULATIVE = "cumulative"
+KIND_RESETTING = "resetting"
+KIND_MEASUREMENT = "measurement"
+
+# Nothing was published before 2020
+FIRST_DAY = date(2020, 1, 1)
+
+
+def statistic_id(key):
+    """Return the long-term statistic id for a NSW Covid statistic."""
+    return f"{DOMAIN}:{key}"
+
+
+def statistic_kind(key, statistic):
+    """Return how a statistic's values relate from one day to the next."""
+    if key in CUMULATIVE_STATISTICS or any(
+        key in layout(measure)[1] for measure in BREAKDOWNS
+    ):
+        return KIND_CUMULATIVE
+    if getattr(statistic, "resetting", False):
+        return KIND_RESETTING
+    return KIND_MEASUREMENT
+
+
+def metadata(key, statistic):
+    """Return the long-term statistic metadata for a statistic."""
+    kind = statistic_kind(key, statistic)
+    unit = getattr(statistic, "unit", None)
+    return {
+        "source": DOMAIN,
+        "statistic_id": statistic_id(key),
+        "name": getattr(statistic, "name", None) or key,
+        "unit_of_measurement": UNITS.get(unit, unit),
+        "has_mean": kind == KIND_MEASUREMENT,
+        "has_sum": kind != KIND_MEASUREMENT,
+    }
+
+
+def start_of(day):
+    """Return the start of a publication day in NSW."""
+    return datetime.combine(day, time(), tzinfo=TZ)
+
+
+def build_rows(key, statistic, rows, sums):
+    """Return long-term statistic rows for (day, value) rows.
+
+    Daily counts that reset are summed into a running total carried in sums,
+    so a long series can be built one chunk at a time.
+    """
+    kind = statistic_kind(key, statistic)
+    data = []
+    for day, value in rows:
+        if value is None:
+            continue
+        if kind == KIND_MEASUREMENT:
+            data.append(
+                {"start": start_of(day), "mean": value, "min": value, "max": value}
+            )
+            continue
+        if kind == KIND_RESETTING:
+            sums[key] = sums.get(key, 0) + value
+            total = sums[key]
+        else:
+            total = value
+        data.append({"start": start_of(day), "state": value, "sum": total})
+    return data
+
+
+def sum_before(rows, day):
+    """Return the sum of the last of the imported rows that starts before day.
+
+    Rows are in order, starting at a datetime, a timestamp or an ISO 8601
+    string as the recorder returns them. Rows from day onwards are replaced by
+    an import, so a total carried on from before day comes out the same
+    however often the same days are imported.
+    """
+    before = start_of(day)
+    total = 0
+    for row in rows:
+        start = row["start"]
+        if isinstance(start, (int, float)):
+            start = dt_util.utc_from_timestamp(start)
+        elif isinstance(start, str):
+            start = dt_util.parse_datetime(start)
+        if start >= before:
+            break
+        total = row.get("sum") or 0
+    return total
+
+
+def rows_before(hass: HomeAssistant, key, day):
+    """Return the rows imported for key that start before day.
+
+    Reads the database, so runs in the recorder's executor.
+    """
+    from homeassistant.components.recorder.statistics import (
+        statistics_during_period,
+    )
+
+    long_term_id = statistic_id(key)
+    # Units and types were added as required arguments in later versions
+    for extra in (({long_term_id}, "hour", None, {"sum"}), ([long_term_id], "hour")):
+        try:
+            rows = statistics_during_period(
+                hass, start_of(FIRST_DAY), start_of(day), *extra
+            )
+            break
+        except TypeError:
+            continue
+    else:
+        return []
+    return rows.get(long_term_id) or []
+
+
+async def async_seed_sums(hass: HomeAssistant, statistics, series, sums):
+    """Seed sums for the resetting statistics in series not yet in it.
+
+    Their running totals carry on from the rows imported before the first
+    day in series, so a backfill does not restart them at zero.
+    """
+    if "recorder" not in hass.config.components:
+        return
+    keys = [
+        key
+        for key, rows in series.items()
+        if rows
+        and key not in sums
+        and statistic_kind(key, statistics.get(key)) == KIND_RESETTING
+    ]
+    if not keys:
+        return
+    try:
+        from homeassistant.components.recorder import get_instance
+
+        executor = get_instance(hass).async_add_executor_job
+    except ImportError:
+        executor = hass.async_add_executor_job
+    for key in keys:
+        day = series[key][0][0]
+        sums[key] = sum_before(await executor(rows_before, hass, key, day), day)
+
+
+def breakdown_rows(day, statistics):
+    """Return one (day, value) row per age and sex bucket currently known."""
+    series = {}
+    for measure in BREAKDOWNS:
+        keys, _index = layout(measure)
+        for key in keys:
+            statistic = statistics.get(key)
+            if statistic is None or statistic.status is None:
+                continue
+            series[key] = [(day, statistic.status)]
+    return series
+
+
+def async_import_statistics(hass: HomeAssistant, statistics, series, sums=None):
+    """Add rows to long-term statistics, returns the number of rows queued.
+
+    series maps a statistic id to (day, value) rows. Each statistic is queued
+    with the recorder as one batch, and rows for a day that was already
+    imported replace it.
+    """
+    if "recorder" not in hass.config.components:
+        return 0
+    try:
+        from homeassistant.components.recorder.statistics import (
+            async_add_external_statistics,
+        )
+    except ImportError:
+        _LOGGER.debug("Long-term statistics are not supported by this version")
+        return 0
+
+    sums = {} if sums is None else sums
+    queued = 0
+    for key, rows in series.items():
+        statistic = statistics.get(key)
+        data = build_rows(key, statistic, rows, sums)
+        if not data:
+            continue
+        async_add_external_statistics(hass, metadata(key, statistic), data)
+        queued += len(data)
+    _LOGGER.debug("Queued %d long-term statistic rows", queued)
+    return queued
@@ -0,0 +1,159 @@
+"""Timings and counts from recent NSW Covid refreshes."""
+from collections import deque
+import logging
+
+from .const import METRICS_WINDOW
+
+_LOGGER = logging.getLogger(__name__)
+
+DURATION_BOUNDS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+SIZE_BOUNDS = (0, 1024, 4096, 16384, 65536, 262144, 1048576)
+COUNT_BOUNDS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+METRIC_FETCH = "fetch_ms"
+METRIC_BYTES = "bytes"
+METRIC_PARSE = "parse_ms"
+METRIC_CHANGED = "changed"
+METRIC_DISPATCH = "dispatch_ms"
+METRIC_WRITE = "write_ms"
+METRIC_UPDATES = "entity_updates"
+METRIC_ERRORS = "errors"
+METRIC_FAILURES = "failures"
+METRIC_NEXT_DELAY = "next_delay"
+
+HISTOGRAMS = {
+    METRIC_FETCH: DURATION_BOUNDS,
+    METRIC_BYTES: SIZE_BOUNDS,
+    METRIC_PARSE: DURATION_BOUNDS,
+    METRIC_CHANGED: COUNT_BOUNDS,
+    METRIC_DISPATCH: DURATION_BOUNDS,
+    METRIC_WRITE: DURATION_BOUNDS,
+    METRIC_UPDATES: COUNT_BOUNDS,
+    METRIC_ERRORS: COUNT_BOUNDS,
+}
+
+# Name, unit and icon of the optional diagnostic sensor for each metric
+DIAGNOSTIC_SENSORS = {
+    METRIC_FETCH: ("Fetch Time", "ms", "mdi:download-network"),
+    METRIC_BYTES: ("Bytes Received", "B", "mdi:download"),
+    METRIC_PARSE: ("Parse Time", "ms", "mdi:code-tags"),
+    METRIC_CHANGED: ("Statistics Changed", None, "mdi:swap-vertical"),
+    METRIC_DISPATCH: ("Dispatch Time", "ms", "mdi:transit-connection-variant"),
+    METRIC_WRITE: ("Entity Write Time", "ms", "mdi:database-clock"),
+    METRIC_UPDATES: ("Entity Updates", None, "mdi:update"),
+    METRIC_ERRORS: ("Fetch Errors", None, "mdi:alert-circle-outline"),
+    METRIC_FAILURES: ("Consecutive Failures", None, "mdi:alert"),
+    METRIC_NEXT_DELAY: ("Next Refresh In", "s", "mdi:timer-sand"),
+}
+
+
+class Histogram:
+    """Bucket counts over the most recent values only."""
+
+    __slots__ = ("__bounds", "__counts", "__recent", "__last")
+
+    def __init__(self, bounds, size=METRICS_WINDOW):
+        """Set up an empty histogram with inclusive upper bounds."""
+        self.__bounds = bounds
+        self.__counts = [0] * (len(bounds) + 1)
+        self.__recent = deque(maxlen=size)
+        self.__last = None
+
+    @property
+    def last(self):
+        """Return the most recent value."""
+        return self.__last
+
+    def add(self, value):
+        """Count a value, forgetting the oldest once the window is full."""
+        index = len(self.__bounds)
+        for position, bound in enumerate(self.__bounds):
+            if value <= bound:
+                index = position
+                break
+        if len(self.__recent) == self.__recent.maxlen:
+            self.__counts[self.__recent[0]] -= 1
+        self.__recent.append(index)
+        self.__counts[index] += 1
+        self.__last = value
+
+    def as_dict(self):
+        """Return the last value and non-empty buckets."""
+        buckets = {}
+        for index, count in enumerate(self.__counts):
+            if not count:
+                continue
+            if index < len(self.__bounds):
+                buckets[f"<={self.__bounds[index]}"] = count
+            else:
+                buckets[f">{self.__bounds[-1]}"] = count
+        return {"last": self.__last, "count": len(self.__recent), "buckets": buckets}
+
+
+class RefreshMetrics:
+    """Where the time went in recent refreshes, and how the polling is doing."""
+
+    def __init__(self, size=METRICS_WINDOW):
+        """Set up empty histograms."""
+        self.__histograms = {
+            metric: Histogram(bounds, size) for metric, bounds in HISTOGRAMS.items()
+        }
+        self.__listeners = {}
+        self.failures = 0
+        self.next_delay = None
+        self.refreshed = None
+
+    def last(self, metric):
+        """Return the value of a metric from the latest refresh."""
+        if metric == METRIC_FAILURES:
+            return self.failures
+        if metric == METRIC_NEXT_DELAY:
+            return round(self.next_delay.total_seconds()) if self.next_delay else None
+        return self.__histograms[metric].last
+
+    def histogram(self, metric):
+        """Return the recent histogram for a metric, None if it has none."""
+        histogram = self.__histograms.get(metric)
+        return histogram.as_dict() if histogram else None
+
+    def record(self, refreshed, **values):
+        """Record a refresh's values and advise subscribers."""
+        for metric, value in values.items():
+            self.__histograms[metric].add(value)
+        self.refreshed = refreshed
+        self.__notify()
+
+    def schedule(self, failures, next_delay):
+        """Record the polling state after a refresh and advise subscribers."""
+        self.failures = failures
+        self.next_delay = next_delay
+        self.__notify()
+
+    def __notify(self):
+        for entity in list(self.__listeners):
+            try:
+                entity.async_device_changed()
+            except Exception as err:
+                _LOGGER.error("Unable to send %s update to HA", entity.entity_id)
+                _LOGGER.exception(err)
+
+    def subscribe(self, entity):
+        """Advise entity after every refresh, returns an unsubscribe callback."""
+        self.__listeners[entity] = True
+
+        def unsubscribe():
+            self.__listeners.pop(entity, None)
+
+        return unsubscribe
+
+    def as_dict(self):
+        """Return every histogram and the polling state."""
+        return {
+            "refreshed": self.refreshed.isoformat() if self.refreshed else None,
+            "failures": self.failures,
+            "next_delay": self.next_delay.total_seconds() if self.next_delay else None,
+            **{
+                metric: histogram.as_dict()
+                for metric, histogram in self.__histograms.items()
+            },
+        }
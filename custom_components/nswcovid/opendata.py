@@ -0,0 +1,149 @@
+"""Structured open data, read in preference to scraping NSW Health.
+
+An open data endpoint serves a CSV file, JSON lines, or JSON holding an
+object or an array of objects, with a column per statistic. Columns are
+matched to statistic ids by name, lower cased with anything other than
+letters and digits replaced by underscores, or through OPEN_DATA_COLUMNS.
+Where there is a row per publication in date order, such as in a backfill
+archive, the last row holds the current values.
+"""
+import codecs
+import csv
+from datetime import datetime
+import io
+import json
+import logging
+import re
+
+from .const import OPEN_DATA_COLUMNS, TIMESTAMP_TYPES
+from .parser import TZ, convert
+
+_LOGGER = logging.getLogger(__name__)
+
+FORMAT_CSV = "csv"
+FORMAT_JSON_LINES = "jsonl"
+FORMAT_JSON = "json"
+
+
+def column_id(name):
+    """Return the statistic id a dataset column holds."""
+    key = re.sub(r"[^a-z0-9]+", "_", str(name).strip().lower()).strip("_")
+    return OPEN_DATA_COLUMNS.get(key, key)
+
+
+def detect(url):
+    """Return the format of the dataset at url, going by its extension."""
+    path = url.split("?", 1)[0].lower()
+    if path.endswith(".csv"):
+        return FORMAT_CSV
+    if path.endswith((".jsonl", ".ndjson")):
+        return FORMAT_JSON_LINES
+    return FORMAT_JSON
+
+
+class OpenDataExtractor:
+    """Keep only the latest row of a dataset as it streams in.
+
+    CSV and JSON lines are parsed a row at a time, so only the header and
+    the latest row are ever held. A CSV row runs on over the line breaks in
+    its quoted fields. JSON has to be read whole.
+    """
+
+    complete = False
+
+    def __init__(self, statistics, data_format):
+        """Set up the extractor for statistics in a dataset of data_format."""
+        self.__statistics = {statistic.id: statistic for statistic in statistics}
+        self.__format = data_format
+        self.__decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.__pending = ""
+        self.__record = ""
+        self.__quotes = 0
+        self.__header = None
+        self.__row = None
+        self.__body = []
+
+    def feed(self, chunk):
+        """Parse the complete lines in a chunk of the dataset."""
+        text = self.__decoder.decode(chunk)
+        if self.__format == FORMAT_JSON:
+            self.__body.append(text)
+            return
+        lines = (self.__pending + text).split("\n")
+        self.__pending = lines.pop()
+        for line in lines:
+            self.__add(line)
+
+    def __add(self, line):
+        """Parse a line, or hold it while a quoted CSV field is still open."""
+        if self.__format == FORMAT_CSV:
+            self.__record += line
+            # Every quote opens or closes a field, doubled ones do both
+            self.__quotes += line.count('"')
+            if self.__quotes % 2:
+                self.__record += "\n"
+                return
+            line, self.__record, self.__quotes = self.__record, "", 0
+        self.__line(line)
+
+    def __line(self, line):
+        if not line.strip():
+            return
+        if self.__format == FORMAT_JSON_LINES:
+            self.__row = json.loads(line)
+            return
+        try:
+            fields = next(csv.reader(io.StringIO(line.rstrip("\r"))))
+        except csv.Error as err:
+            raise ValueError(f"Unreadable row: {err}") from err
+        if self.__header is None:
+            self.__header = fields
+            return
+        self.__row = dict(zip(self.__header, fields))
+
+    def close(self):
+        """Return a mapping of statistic id to value from the latest row.
+
+        Raises ValueError when the dataset has no rows.
+        """
+        tail = self.__pending + self.__decoder.decode(b"", final=True)
+        self.__pending = ""
+        if self.__format == FORMAT_JSON:
+            data = json.loads("".join(self.__body) + tail)
+            if isinstance(data, dict) and isinstance(data.get("data"), list):
+                data = data["data"]
+            if isinstance(data, list):
+                data = data[-1] if data else None
+            self.__row = data
+        else:
+            self.__add(tail)
+            if self.__record:
+                # A quoted field left open at the end of the dataset
+                self.__line(self.__record)
+        if not isinstance(self.__row, dict):
+            raise ValueError("Dataset has no rows")
+
+        values = {}
+        for name, raw in self.__row.items():
+            statistic = self.__statistics.get(column_id(name))
+            if statistic is None or raw in (None, ""):
+                continue
+            try:
+                values[statistic.id] = _convert(statistic, raw)
+            except (TypeError, ValueError) as err:
+                _LOGGER.debug("Unable to read %s from %s: %s", statistic.id, raw, err)
+        return values
+
+
+def _convert(statistic, raw):
+    """Convert a dataset value, timestamps are ISO 8601 where possible."""
+    if statistic.typeName not in TIMESTAMP_TYPES or not isinstance(raw, str):
+        return convert(statistic.typeName, raw)
+    try:
+        value = datetime.fromisoformat(raw)
+    except ValueError:
+        return convert(statistic.typeName, raw)
+    # Publication times without an offset are local to NSW, as on the page
+    if value.tzinfo is None and statistic.typeName == "nswcoviddate":
+        value = value.replace(tzinfo=TZ)
+    return value
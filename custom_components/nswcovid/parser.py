@@ -0,0 +1,396 @@
+"""Extract NSW Covid statistic values from upstream documents."""
+from datetime import datetime
+import logging
+import re
+
+from homeassistant.util import dt as dt_util
+
+from .const import NSWHEALTH_TIMEZONE
+
+_LOGGER = logging.getLogger(__name__)
+
+TZ = dt_util.get_time_zone(NSWHEALTH_TIMEZONE)
+
+
+def preload():
+    """Import the parsing libraries, which are slow to import."""
+    import bs4  # noqa: F401
+    import jello.lib  # noqa: F401
+    import lxml.etree  # noqa: F401
+
+
+def extract(statistics, body):
+    """Return a mapping of statistic id to value found in body."""
+    from bs4 import BeautifulSoup
+    from jello.lib import load_json
+    from lxml import etree
+
+    if not body:
+        return {}
+
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", errors="replace")
+
+    soup = None
+    dom = None
+    json_data = None
+
+    if any(
+        statistic.selector is not None or statistic.xpath is not None
+        for statistic in statistics
+    ):
+        soup = BeautifulSoup(body, "lxml")
+        for tag in soup(["style", "script"]):
+            tag.decompose()
+        if any(statistic.xpath is not None for statistic in statistics):
+            dom = etree.HTML(str(soup))
+
+    if any(statistic.json_search is not None for statistic in statistics):
+        try:
+            json_data = load_json(body)
+        except Exception as err:
+            _LOGGER.error("Unable to parse JSON document: %s", err)
+
+    values = {}
+    for statistic in statistics:
+        try:
+            found, value = _extract_one(statistic, soup, dom, json_data)
+        except Exception as err:
+            _LOGGER.error("Failed extracting %s", statistic.id)
+            _LOGGER.exception(err)
+            continue
+        if found:
+            values[statistic.id] = value
+    return values
+
+
+def _extract_one(statistic, soup, dom, json_data):
+    """Locate and convert the value of a single statistic."""
+    from jello.lib import pyquery
+
+    value = None
+
+    if statistic.selector is not None and soup is not None:
+        reference = soup.select_one(statistic.selector)
+        if not reference:
+            _LOGGER.error(
+                "%s could not find selector %s", statistic.id, statistic.selector
+            )
+            return False, None
+        value = reference.string
+
+    if statistic.xpath is not None and dom is not None:
+        reference = dom.xpath(statistic.xpath)
+        if not reference:
+            _LOGGER.error("%s could not find xpath %s", statistic.id, statistic.xpath)
+            return False, None
+        value = reference[0]
+
+    if statistic.json_search is not None:
+        if json_data is None:
+            _LOGGER.error(
+                "Attempt to locate %s in empty document. Confirm source is still valid.",
+                statistic.id,
+            )
+            return False, None
+        value = pyquery(json_data, statistic.json_search)
+        if isinstance(value, list):
+            value = value[0] if value else None
+        if statistic.typeName == "integer" and value is None:
+            value = 0
+
+    return _finish(statistic, value)
+
+
+def _finish(statistic, value):
+    """Apply a statistic's regex and type to a located raw value."""
+    regex = statistic.regex
+    if regex is not None and value is not None:
+        match = regex.search(str(value))
+        if not match:
+            return False, None
+        value = match.group()
+
+    return True, convert(statistic.typeName, value)
+
+
+SELECTOR_STEP = re.compile(
+    r"^(?P<tag>[a-z][a-z0-9]*)?(?:#(?P<id>[\w-]+))?(?P<classes>(?:\.[\w-]+)*)"
+    r"(?::nth-child\((?P<nth_child>\d+)\))?$"
+)
+XPATH_ANCHOR = re.compile(r'^//\*\[@id="(?P<id>[\w-]+)"\]$')
+XPATH_STEP = re.compile(r"^(?P<tag>[a-z][a-z0-9]*)(?:\[(?P<nth_of_type>\d+)\])?$")
+
+IGNORED_TAGS = ("script", "style")
+
+
+class Step:
+    """One element in a compiled selector or xpath."""
+
+    __slots__ = ("tag", "id", "classes", "nth_child", "nth_of_type")
+
+    def __init__(self, tag=None, id=None, classes=(), nth_child=None, nth_of_type=None):
+        """Set up the step."""
+        self.tag = tag
+        self.id = id
+        self.classes = frozenset(classes)
+        self.nth_child = nth_child
+        self.nth_of_type = nth_of_type
+
+    def matches(self, element):
+        """Return True if the element frame satisfies this step."""
+        if self.tag is not None and self.tag != element.tag:
+            return False
+        if self.id is not None and self.id != element.id:
+            return False
+        if self.classes and not self.classes <= element.classes:
+            return False
+        if self.nth_child is not None and self.nth_child != element.nth_child:
+            return False
+        if self.nth_of_type is not None and self.nth_of_type != element.nth_of_type:
+            return False
+        return True
+
+
+def compile_path(statistic):
+    """Compile a statistic's selector or xpath into steps, None if unsupported.
+
+    Only child combinators anchored on an element id are supported, which is
+    all the NSW Health page needs. Anything else is left to extract().
+    """
+    if statistic.json_search is not None:
+        return None
+    if statistic.selector is not None and statistic.xpath is None:
+        steps = []
+        for part in statistic.selector.split(">"):
+            match = SELECTOR_STEP.match(part.strip())
+            if not match or not part.strip():
+                return None
+            nth_child = match.group("nth_child")
+            steps.append(
+                Step(
+                    tag=match.group("tag"),
+                    id=match.group("id"),
+                    classes=[c for c in match.group("classes").split(".") if c],
+                    nth_child=int(nth_child) if nth_child else None,
+                )
+            )
+        if steps[0].id is None:
+            return None
+        return tuple(steps), False
+    if statistic.xpath is not None and statistic.selector is None:
+        parts = statistic.xpath.split("/", 3)
+        if len(parts) < 4 or parts[0] or parts[1]:
+            return None
+        anchor = XPATH_ANCHOR.match("//" + parts[2])
+        if not anchor:
+            return None
+        steps = [Step(id=anchor.group("id"))]
+        for part in parts[3].split("/"):
+            if part == "text()":
+                break
+            match = XPATH_STEP.match(part)
+            if not match:
+                return None
+            nth_of_type = match.group("nth_of_type")
+            steps.append(
+                Step(
+                    tag=match.group("tag"),
+                    nth_of_type=int(nth_of_type) if nth_of_type else None,
+                )
+            )
+        return tuple(steps), True
+    return None
+
+
+class _Element:
+    """An open element while streaming."""
+
+    __slots__ = (
+        "tag",
+        "id",
+        "classes",
+        "nth_child",
+        "nth_of_type",
+        "children",
+        "types",
+        "partial",
+        "captures",
+        "ignored",
+    )
+
+    def __init__(self, tag, attrib, nth_child, nth_of_type, ignored=False):
+        self.tag = tag
+        self.id = attrib.get("id")
+        self.classes = frozenset(attrib.get("class", "").split())
+        self.nth_child = nth_child
+        self.nth_of_type = nth_of_type
+        self.children = 0
+        self.types = {}
+        self.partial = ()
+        self.captures = ()
+        self.ignored = ignored
+
+
+class _Capture:
+    """Text collected for a statistic whose element has been found."""
+
+    __slots__ = ("target", "texts", "direct", "depth")
+
+    def __init__(self, target, depth):
+        self.target = target
+        self.texts = []
+        self.direct = []
+        self.depth = depth
+
+
+class StreamingExtractor:
+    """Extract statistics from HTML fed in chunks, keeping only target text.
+
+    Only the stack of currently open elements is held, so memory is bounded by
+    the page's nesting depth and the captured cells rather than its size.
+    """
+
+    def __init__(self, statistics):
+        """Set up the extractor, statistics must all compile_path()."""
+        from lxml import etree
+
+        self.__targets = []
+        for statistic in statistics:
+            steps, text_node = compile_path(statistic)
+            self.__targets.append((statistic, steps, text_node))
+        self.__pending = set(range(len(self.__targets)))
+        self.__raw = {}
+        self.__stack = [_Element("#document", {}, 0, 0)]
+        self.__open = []
+        self.__parser = etree.HTMLParser(target=self, encoding="utf-8")
+        self.__closed = False
+
+    @property
+    def complete(self):
+        """Return True once every statistic has been found and read whole."""
+        return not self.__pending and not self.__open
+
+    def feed(self, chunk):
+        """Feed the next chunk of the document."""
+        if not self.__closed:
+            self.__parser.feed(chunk)
+
+    def close(self):
+        """Finish parsing, returns a mapping of statistic id to value."""
+        if not self.__closed:
+            from lxml import etree
+
+            self.__closed = True
+            try:
+                self.__parser.close()
+            except etree.XMLSyntaxError:
+                pass
+        values = {}
+        for index, (statistic, _steps, _text_node) in enumerate(self.__targets):
+            if index not in self.__raw:
+                _LOGGER.error("%s could not be found in the stream", statistic.id)
+                continue
+            try:
+                found, value = _finish(statistic, self.__raw[index])
+            except Exception as err:
+                _LOGGER.error("Failed extracting %s", statistic.id)
+                _LOGGER.exception(err)
+                continue
+            if found:
+                values[statistic.id] = value
+        return values
+
+    def start(self, tag, attrib):
+        """Handle an element opening."""
+        parent = self.__stack[-1]
+        if parent.ignored or tag in IGNORED_TAGS:
+            self.__stack.append(_Element(tag, attrib, 0, 0, ignored=True))
+            return
+        parent.children += 1
+        parent.types[tag] = parent.types.get(tag, 0) + 1
+        element = _Element(tag, attrib, parent.children, parent.types[tag])
+
+        partial = []
+        captures = []
+        for index in self.__pending:
+            steps = self.__targets[index][1]
+            reached = None
+            if steps[0].matches(element):
+                reached = 0
+            for target, step in parent.partial:
+                if target == index and steps[step + 1].matches(element):
+                    reached = step + 1
+            if reached is None:
+                continue
+            if reached == len(steps) - 1:
+                captures.append(_Capture(index, len(self.__stack)))
+            else:
+                partial.append((index, reached))
+        element.partial = tuple(partial)
+        element.captures = tuple(captures)
+        for capture in captures:
+            self.__pending.discard(capture.target)
+            self.__open.append(capture)
+        self.__stack.append(element)
+
+    def end(self, tag):
+        """Handle an element closing."""
+        if len(self.__stack) < 2:
+            return
+        element = self.__stack.pop()
+        for capture in element.captures:
+            self.__open.remove(capture)
+            if self.__targets[capture.target][2]:
+                self.__raw[capture.target] = (
+                    capture.direct[0] if capture.direct else None
+                )
+            else:
+                self.__raw[capture.target] = "".join(capture.texts) or None
+
+    def data(self, data):
+        """Handle text content."""
+        if not self.__open or self.__stack[-1].ignored:
+            return
+        depth = len(self.__stack) - 1
+        for capture in self.__open:
+            capture.texts.append(data)
+            if capture.depth == depth:
+                capture.direct.append(data)
+
+    def comment(self, text):
+        """Ignore comments."""
+
+    def doctype(self, *args):
+        """Ignore the doctype."""
+
+    def pi(self, *args):
+        """Ignore processing instructions."""
+
+
+def convert(type_name, value):
+    """Convert a raw extracted value to the statistic's declared type."""
+    if type_name is None or value is None:
+        return value
+    if type_name == "integer":
+        if isinstance(value, str):
+            return int(re.sub("[^0-9]", "", value))
+        return int(value)
+    if type_name == "float":
+        if isinstance(value, str):
+            return float(value.replace(",", ""))
+        return float(value)
+    if type_name == "boolean":
+        return bool(value)
+    if type_name == "nswcoviddate":
+        value = datetime.strptime(value.upper(), "%I%p %d %B %Y")
+        return value.replace(tzinfo=TZ)
+    if type_name == "dateymd":
+        return datetime.strptime(value, "%Y-%m-%d")
+    if type_name == "date":
+        return datetime.strptime(value, "%d/%m/%Y")
+    if type_name == "datetime":
+        return datetime.strptime(value, "%d/%m/%Y %H:%M:%S")
+    if type_name == "time":
+        return datetime.strptime(value, "%H:%M:%S")
+    return str(value)
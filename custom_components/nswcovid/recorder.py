@@ -0,0 +1,21 @@
+"""Keep bulky NSW Covid attributes out of the recorder."""
+from homeassistant.const import ATTR_ATTRIBUTION
+from homeassistant.core import HomeAssistant, callback
+
+from .buckets import layout
+from .const import ATTR_CASES, ATTR_LIVES_LOST, ATTR_PUBLISHED
+
+
+@callback
+def exclude_attributes(hass: HomeAssistant) -> set:
+    """Return the attributes not written to every recorded state.
+
+    Used by Home Assistant versions from before _unrecorded_attributes.
+    """
+    return {
+        ATTR_ATTRIBUTION,
+        ATTR_PUBLISHED,
+        "buckets",
+        *layout(ATTR_CASES)[0],
+        *layout(ATTR_LIVES_LOST)[0],
+    }
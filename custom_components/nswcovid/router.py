@@ -0,0 +1,124 @@
+"""Route NSW Covid statistic events to the entities that use them."""
+from contextlib import contextmanager
+import logging
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class StatisticRouter:
+    """Index of statistic id to the entities interested in it."""
+
+    def __init__(self):
+        """Set up an empty routing index."""
+        self.__routes = {}
+        self.__pending = None
+        self.__unavailable = set()
+        self.__last_flush = (0, 0.0)
+
+    @property
+    def last_flush(self):
+        """Return the entities advised and seconds taken by the last batch."""
+        return self.__last_flush
+
+    def subscribe(self, statistic_ids, entity, on_change=None):
+        """Route updates for statistic_ids to entity, returns an unsubscribe callback.
+
+        on_change is called with the changed statistic as soon as it changes,
+        while the entity itself is only advised once per batch.
+        """
+        statistic_ids = tuple(statistic_ids)
+        for statistic_id in statistic_ids:
+            self.__routes.setdefault(statistic_id, {})[entity] = on_change
+
+        def unsubscribe():
+            for statistic_id in statistic_ids:
+                entities = self.__routes.get(statistic_id)
+                if not entities:
+                    continue
+                entities.pop(entity, None)
+                if not entities:
+                    del self.__routes[statistic_id]
+
+        return unsubscribe
+
+    def dispatch(self, payload):
+        """Advise the entities subscribed to the payload's statistic."""
+        if getattr(payload, "event_type", None) != "statistic_updated":
+            return None
+        entities = self.__routes.get(payload.id)
+        if not entities:
+            return None
+        _LOGGER.debug(
+            "[%s] routing %s to %d entities", payload.ts, payload.id, len(entities)
+        )
+        for entity, on_change in entities.items():
+            if on_change is None:
+                continue
+            # One entity failing must not keep the change from the others
+            try:
+                on_change(payload.subject)
+            except Exception as err:
+                _LOGGER.error(
+                    "Unable to apply %s to %s",
+                    payload.id,
+                    getattr(entity, "entity_id", entity),
+                )
+                _LOGGER.exception(err)
+        if self.__pending is not None:
+            self.__pending.update(entities)
+            return True
+        self.__notify(entities)
+        return True
+
+    def available(self, statistic_ids):
+        """Return True unless any of statistic_ids could not be refreshed."""
+        return self.__unavailable.isdisjoint(statistic_ids)
+
+    def set_available(self, statistic_ids, available):
+        """Mark statistics available or not, advising entities that use them."""
+        statistic_ids = set(statistic_ids)
+        if available:
+            affected = statistic_ids & self.__unavailable
+            self.__unavailable -= affected
+        else:
+            affected = statistic_ids - self.__unavailable
+            self.__unavailable |= affected
+        entities = set()
+        for statistic_id in affected:
+            entities.update(self.__routes.get(statistic_id, ()))
+        if not entities:
+            return
+        if self.__pending is not None:
+            self.__pending.update(entities)
+            return
+        self.__notify(entities)
+
+    @contextmanager
+    def batch(self):
+        """Collect changed entities and advise each of them once on exit."""
+        if self.__pending is not None:
+            yield
+            return
+        self.__pending = set()
+        try:
+            yield
+        finally:
+            pending, self.__pending = self.__pending, None
+            started = time.perf_counter()
+            if pending:
+                _LOGGER.debug("Flushing %d changed entities", len(pending))
+                self.__notify(pending)
+            self.__last_flush = (len(pending), time.perf_counter() - started)
+
+    @staticmethod
+    def __notify(entities):
+        for entity in entities:
+            try:
+                entity.async_device_changed()
+            except Exception as err:
+                _LOGGER.error(
+                    "Unable to send %s update to HA",
+                    getattr(entity, "entity_id", entity),
+                )
+                _LOGGER.exception(err)
@@ -0,0 +1,132 @@
+"""Publication aware polling schedule for NSW Covid statistics."""
+from datetime import time, timedelta
+import logging
+import random
+
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    CONF_IDLE_INTERVAL,
+    CONF_WINDOW_END,
+    CONF_WINDOW_INTERVAL,
+    CONF_WINDOW_START,
+    DEFAULT_IDLE_INTERVAL,
+    DEFAULT_MAX_BACKOFF,
+    DEFAULT_RETRY_INTERVAL,
+    DEFAULT_WINDOW_END,
+    DEFAULT_WINDOW_INTERVAL,
+    DEFAULT_WINDOW_START,
+    NSWHEALTH_TIMEZONE,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+TZ = dt_util.get_time_zone(NSWHEALTH_TIMEZONE)
+
+# Enough doublings to reach any sensible max_backoff, without overflowing
+MAX_DOUBLINGS = 16
+
+
+class PollScheduler:
+    """Poll tightly while a publication is due, and rarely once it has landed."""
+
+    def __init__(
+        self,
+        window_start=DEFAULT_WINDOW_START,
+        window_end=DEFAULT_WINDOW_END,
+        window_interval=DEFAULT_WINDOW_INTERVAL,
+        idle_interval=DEFAULT_IDLE_INTERVAL,
+        retry_interval=DEFAULT_RETRY_INTERVAL,
+        max_backoff=DEFAULT_MAX_BACKOFF,
+    ):
+        """Set up the schedule, window times are NSW local time."""
+        self.__window_start = window_start
+        self.__window_end = window_end
+        self.__window_interval = window_interval
+        self.__idle_interval = idle_interval
+        self.__retry_interval = retry_interval
+        self.__max_backoff = max_backoff
+        self.__failures = 0
+        self.__published = None
+        self.__published_day = None
+
+    @classmethod
+    def from_options(cls, options):
+        """Return a schedule using a config entry's options.
+
+        The window is given in whole hours of the day, and the intervals in
+        minutes.
+        """
+        return cls(
+            window_start=time(
+                options.get(CONF_WINDOW_START, DEFAULT_WINDOW_START.hour)
+            ),
+            window_end=time(options.get(CONF_WINDOW_END, DEFAULT_WINDOW_END.hour)),
+            window_interval=(
+                timedelta(minutes=options[CONF_WINDOW_INTERVAL])
+                if CONF_WINDOW_INTERVAL in options
+                else DEFAULT_WINDOW_INTERVAL
+            ),
+            idle_interval=(
+                timedelta(minutes=options[CONF_IDLE_INTERVAL])
+                if CONF_IDLE_INTERVAL in options
+                else DEFAULT_IDLE_INTERVAL
+            ),
+        )
+
+    @property
+    def failures(self):
+        """Return the number of consecutive failed refreshes."""
+        return self.__failures
+
+    def success(self, published, now=None):
+        """Record a successful refresh and the published timestamp it saw."""
+        self.__failures = 0
+        if published is None:
+            return
+        today = (now or dt_util.now()).astimezone(TZ).date()
+        advanced = self.__published is not None and published != self.__published
+        if advanced or published.astimezone(TZ).date() == today:
+            self.__published_day = today
+        self.__published = published
+
+    def failure(self):
+        """Record a failed refresh."""
+        self.__failures += 1
+
+    def next_delay(self, now=None):
+        """Return how long to wait before the next refresh."""
+        if self.__failures:
+            backoff = min(
+                self.__max_backoff,
+                self.__retry_interval * 2 ** min(self.__failures - 1, MAX_DOUBLINGS),
+            )
+            delay = backoff / 2 + backoff / 2 * random.random()
+            _LOGGER.debug(
+                "Backing off %d seconds after %d failures",
+                delay.total_seconds(),
+                self.__failures,
+            )
+            return delay
+
+        now = (now or dt_util.now()).astimezone(TZ)
+        start = now.replace(
+            hour=self.__window_start.hour,
+            minute=self.__window_start.minute,
+            second=0,
+            microsecond=0,
+        )
+        end = now.replace(
+            hour=self.__window_end.hour,
+            minute=self.__window_end.minute,
+            second=0,
+            microsecond=0,
+        )
+
+        if now < start:
+            return min(self.__idle_interval, start - now)
+
+        if now < end and self.__published_day != now.date():
+            return self.__window_interval
+
+        return min(self.__idle_interval, start + timedelta(days=1) - now)
@@ -1,102 +1,21 @@
 """NSW Covid 19 Data"""
-from datetime import timedelta
 import logging
+from types import MappingProxyType
 
 from homeassistant.const import (
     ATTR_ATTRIBUTION,
+    PERCENTAGE,
 )
-from homeassistant.core import callback
-from homeassistant.helpers import device_registry, entity
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
-import homeassistant.helpers.config_validation as cv
-from homeassistant.helpers.dispatcher import async_dispatcher_connect
-from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers import device_registry, entity_registry
 from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.helpers.typing import HomeAssistantType
-from homeassistant.util import slugify
-from homeassistant.helpers.typing import StateType
-from homeassistant.components import sensor
 from homeassistant.components.sensor import SensorEntity
 
 from . import DOMAIN
 from .const import (
     ATTR_PUBLISHED,
-    ATTR_LOCALLY_ACTIVE,
-    ATTR_INTERSTATE_ACTIVE,
-    ATTR_OVERSEAS_ACTIVE,
-    ATTR_TOTAL_ACTIVE,
-    ATTR_LAST_24_HOURS_KNOWN,
-    ATTR_LAST_24_HOURS_UNKNOWN,
-    ATTR_LAST_24_HOURS_INTERSTATE,
-    ATTR_LAST_24_HOURS_OVERSEAS,
-    ATTR_LAST_24_HOURS_TOTAL,
-    ATTR_LAST_24_HOURS_TESTS,
-    ATTR_THIS_WEEK_KNOWN,
-    ATTR_THIS_WEEK_UNKNOWN,
-    ATTR_THIS_WEEK_INTERSTATE,
-    ATTR_THIS_WEEK_OVERSEAS,
-    ATTR_THIS_WEEK_TOTAL,
-    ATTR_THIS_WEEK_TESTS,
-    ATTR_LAST_WEEK_KNOWN,
-    ATTR_LAST_WEEK_UNKNOWN,
-    ATTR_LAST_WEEK_INTERSTATE,
-    ATTR_LAST_WEEK_OVERSEAS,
-    ATTR_LAST_WEEK_TOTAL,
-    ATTR_LAST_WEEK_TESTS,
-    ATTR_THIS_YEAR_KNOWN,
-    ATTR_THIS_YEAR_UNKNOWN,
-    ATTR_THIS_YEAR_INTERSTATE,
-    ATTR_THIS_YEAR_OVERSEAS,
-    ATTR_THIS_YEAR_TOTAL,
-    ATTR_THIS_YEAR_TESTS,
-    ATTR_LAST_24_HOURS_FIRST_DOSE,
-    ATTR_LAST_24_HOURS_SECOND_DOSE,
-    ATTR_LAST_24_HOURS_TOTAL_DOSE,
-    ATTR_TOTAL_FIRST_DOSE,
-    ATTR_TOTAL_SECOND_DOSE,
-    ATTR_TOTAL_TOTAL_DOSE,
     ATTR_LIVES_LOST,
-    ATTR_LIVES_LOST_FEMALE_0_9,
-    ATTR_LIVES_LOST_FEMALE_10_19,
-    ATTR_LIVES_LOST_FEMALE_20_29,
-    ATTR_LIVES_LOST_FEMALE_30_39,
-    ATTR_LIVES_LOST_FEMALE_40_49,
-    ATTR_LIVES_LOST_FEMALE_50_59,
-    ATTR_LIVES_LOST_FEMALE_60_69,
-    ATTR_LIVES_LOST_FEMALE_70_79,
-    ATTR_LIVES_LOST_FEMALE_80_89,
-    ATTR_LIVES_LOST_FEMALE_90_PLUS,
-    ATTR_LIVES_LOST_MALE_0_9,
-    ATTR_LIVES_LOST_MALE_10_19,
-    ATTR_LIVES_LOST_MALE_20_29,
-    ATTR_LIVES_LOST_MALE_30_39,
-    ATTR_LIVES_LOST_MALE_40_49,
-    ATTR_LIVES_LOST_MALE_50_59,
-    ATTR_LIVES_LOST_MALE_60_69,
-    ATTR_LIVES_LOST_MALE_70_79,
-    ATTR_LIVES_LOST_MALE_80_89,
-    ATTR_LIVES_LOST_MALE_90_PLUS,
     ATTR_CASES,
-    ATTR_CASES_FEMALE_0_9,
-    ATTR_CASES_FEMALE_10_19,
-    ATTR_CASES_FEMALE_20_29,
-    ATTR_CASES_FEMALE_30_39,
-    ATTR_CASES_FEMALE_40_49,
-    ATTR_CASES_FEMALE_50_59,
-    ATTR_CASES_FEMALE_60_69,
-    ATTR_CASES_FEMALE_70_79,
-    ATTR_CASES_FEMALE_80_89,
-    ATTR_CASES_FEMALE_90_PLUS,
-    ATTR_CASES_MALE_0_9,
-    ATTR_CASES_MALE_10_19,
-    ATTR_CASES_MALE_20_29,
-    ATTR_CASES_MALE_30_39,
-    ATTR_CASES_MALE_40_49,
-    ATTR_CASES_MALE_50_59,
-    ATTR_CASES_MALE_60_69,
-    ATTR_CASES_MALE_70_79,
-    ATTR_CASES_MALE_80_89,
-    ATTR_CASES_MALE_90_PLUS,
     ATTR_DOSES,
     ATTR_NSW_HEALTH_DOSES_DAILY,
     ATTR_NSW_HEALTH_DOSES_CUMULATIVE,
@@ -104,230 +23,200 @@ from .const import (
     ATTR_NSW_HEALTH_DOSES_UPDATED,
     ATTR_GP_NETWORK_DOSES_UPDATED,
     ATTR_ALL_PROVIDERS_DOSES_CUMULATIVE,
-    DEVICE_CLASS_COVID_CASES,
-    DEVICE_CLASS_COVID_VACCINATIONS,
     NSWHEALTH_NAME,
-    MANUFACTURER,
+    GROUP_AGE_SEX,
+    GROUP_DOSES,
+    ACTIVE_SENSORS,
+    TREND_SENSORS,
+    TREND_AVERAGE,
+    TREND_DAY_OVER_DAY,
+    TREND_WEEK_OVER_WEEK,
 )
+from .buckets import AgeSexBuckets, layout
+from .descriptions import STATE_CLASS_CUMULATIVE, STATE_CLASS_MEASUREMENT, describe
+from .devices import device_info, device_of
+from .metrics import DIAGNOSTIC_SENSORS
+from .scheduler import PollScheduler
 
-ACTIVE_SENSORS = [
-    ATTR_PUBLISHED,
-    ATTR_LOCALLY_ACTIVE,
-    ATTR_INTERSTATE_ACTIVE,
-    ATTR_OVERSEAS_ACTIVE,
-    ATTR_TOTAL_ACTIVE,
-    ATTR_LAST_24_HOURS_KNOWN,
-    ATTR_LAST_24_HOURS_UNKNOWN,
-    ATTR_LAST_24_HOURS_INTERSTATE,
-    ATTR_LAST_24_HOURS_OVERSEAS,
-    ATTR_LAST_24_HOURS_TOTAL,
-    ATTR_LAST_24_HOURS_TESTS,
-    ATTR_THIS_WEEK_KNOWN,
-    ATTR_THIS_WEEK_UNKNOWN,
-    ATTR_THIS_WEEK_INTERSTATE,
-    ATTR_THIS_WEEK_OVERSEAS,
-    ATTR_THIS_WEEK_TOTAL,
-    ATTR_THIS_WEEK_TESTS,
-    ATTR_LAST_WEEK_KNOWN,
-    ATTR_LAST_WEEK_UNKNOWN,
-    ATTR_LAST_WEEK_INTERSTATE,
-    ATTR_LAST_WEEK_OVERSEAS,
-    ATTR_LAST_WEEK_TOTAL,
-    ATTR_LAST_WEEK_TESTS,
-    ATTR_THIS_YEAR_KNOWN,
-    ATTR_THIS_YEAR_UNKNOWN,
-    ATTR_THIS_YEAR_INTERSTATE,
-    ATTR_THIS_YEAR_OVERSEAS,
-    ATTR_THIS_YEAR_TOTAL,
-    ATTR_THIS_YEAR_TESTS,
-    ATTR_LAST_24_HOURS_FIRST_DOSE,
-    ATTR_LAST_24_HOURS_SECOND_DOSE,
-    ATTR_LAST_24_HOURS_TOTAL_DOSE,
-    ATTR_TOTAL_FIRST_DOSE,
-    ATTR_TOTAL_SECOND_DOSE,
-    ATTR_TOTAL_TOTAL_DOSE,
-]
 
 _LOGGER = logging.getLogger(__name__)
 
-DEFAULT_SCAN_INTERVAL = timedelta(minutes=5)
-SCAN_INTERVAL = DEFAULT_SCAN_INTERVAL
+try:
+    from homeassistant.helpers.entity import EntityCategory
+
+    ENTITY_CATEGORY_DIAGNOSTIC = EntityCategory.DIAGNOSTIC
+except ImportError:
+    ENTITY_CATEGORY_DIAGNOSTIC = "diagnostic"
 
-TIMESTAMP_TYPES = ["nswcoviddate", "date", "time", "datetime", "dateymd"]
+# Nothing has been read into the entity yet
+UNREAD = object()
 
 
 async def async_setup_entry(hass: HomeAssistantType, entry, async_add_entities):
     """Configure a dispatcher connection based on a config entry."""
 
-    api = hass.data[DOMAIN][entry.entry_id]
-
-    if not "entity_ref" in hass.data[DOMAIN]:
-        hass.data[DOMAIN]["entity_ref"] = {}
-
-    if not "tasks" in hass.data[DOMAIN]:
-        hass.data[DOMAIN]["tasks"] = {}
-
-    def device_event_handler(payload):
-        event_type = getattr(payload, "event_type", None)
-        subject = getattr(payload, "subject", None)
-        if not (event_type and subject):
-            _LOGGER.warning("Event received with no type or statistic")
-            return None
-        if not event_type == "statistic_updated":
-            return None
-        _LOGGER.debug("[%s] %s event received: %s", payload.ts, event_type, payload.id)
-        try:
-            event_entity = getattr(hass.data[DOMAIN]["entity_ref"], payload.id, None)
-            if event_entity:
-                event_entity.async_device_changed()
-        except Exception as err:
-            _LOGGER.error("Unable to send update to HA")
-            _LOGGER.exception(err)
-            raise err
-
-    hass.data[DOMAIN][entry.entry_id].addListener(device_event_handler)
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    api = coordinator.tracker
+    router = api.router
 
     entities = []
     for statistic_id in api.statistics:
         statistic = api.statistics[statistic_id]
         if statistic and statistic_id in ACTIVE_SENSORS:
-            hass.data[DOMAIN]["entity_ref"][statistic.id] = NSWCovidEntry(statistic)
-            entities.append(hass.data[DOMAIN]["entity_ref"][statistic.id])
-
-    hass.data[DOMAIN]["entity_ref"][ATTR_LIVES_LOST] = NSWCovidDeaths(api.statistics)
-    hass.data[DOMAIN][entry.entry_id].addListener(
-        hass.data[DOMAIN]["entity_ref"][ATTR_LIVES_LOST].event_listener
-    )
-    entities.append(hass.data[DOMAIN]["entity_ref"][ATTR_LIVES_LOST])
-
-    hass.data[DOMAIN]["entity_ref"][ATTR_CASES] = NSWCovidCases(api.statistics)
-    hass.data[DOMAIN][entry.entry_id].addListener(
-        hass.data[DOMAIN]["entity_ref"][ATTR_CASES].event_listener
-    )
-    entities.append(hass.data[DOMAIN]["entity_ref"][ATTR_CASES])
-
-    hass.data[DOMAIN]["entity_ref"][ATTR_DOSES] = NSWCovidDoses(api.statistics)
-    hass.data[DOMAIN][entry.entry_id].addListener(
-        hass.data[DOMAIN]["entity_ref"][ATTR_DOSES].event_listener
-    )
-    entities.append(hass.data[DOMAIN]["entity_ref"][ATTR_DOSES])
+            entities.append(NSWCovidEntry(statistic, router))
+
+    if GROUP_AGE_SEX in coordinator.groups:
+        entities.append(NSWCovidDeaths(api.statistics, router))
+        entities.append(NSWCovidCases(api.statistics, router))
+    if GROUP_DOSES in coordinator.groups:
+        entities.append(NSWCovidDoses(api.statistics, router))
+
+    history = coordinator.history
+    for statistic_id in TREND_SENSORS:
+        if history.series(statistic_id) is None:
+            continue
+        for trend in (TREND_AVERAGE, TREND_DAY_OVER_DAY, TREND_WEEK_OVER_WEEK):
+            entities.append(NSWCovidTrend(api.statistics[statistic_id], history, trend))
+
+    for metric in DIAGNOSTIC_SENSORS:
+        entities.append(NSWCovidDiagnostic(api.metrics, metric))
+
+    # Drop the entities of groups that are no longer selected
+    registry = entity_registry.async_get(hass)
+    unique_ids = {entity.unique_id for entity in entities}
+    for registered in entity_registry.async_entries_for_config_entry(
+        registry, entry.entry_id
+    ):
+        if registered.unique_id not in unique_ids:
+            _LOGGER.debug(
+                "Removing %s, its group is not selected", registered.entity_id
+            )
+            registry.async_remove(registered.entity_id)
+
+    # And the devices that only held them
+    devices = device_registry.async_get(hass)
+    identifiers = {(DOMAIN, device_of(unique_id)) for unique_id in unique_ids}
+    for device in device_registry.async_entries_for_config_entry(
+        devices, entry.entry_id
+    ):
+        if not device.identifiers & identifiers:
+            devices.async_remove_device(device.id)
 
+    coordinator.add_entities(entities)
     async_add_entities(entities)
 
-    hass.data[DOMAIN]["tasks"]["statistic_tracker"] = api.track(interval=SCAN_INTERVAL)
+    coordinator.start(PollScheduler.from_options(entry.options))
+
 
+class ChangeOnlyEntity:
+    """Only write state to HA when it differs from the state last written."""
 
-class NSWCovidEntry(RestoreEntity, SensorEntity):
+    __fingerprint = None
+    __suppressed = 0
+
+    @property
+    def suppressed_writes(self):
+        """Return how many unchanged state writes have been dropped."""
+        return self.__suppressed
+
+    def __state_fingerprint(self):
+        attributes = self.extra_state_attributes or {}
+        return (self.available, self.state, tuple(attributes.items()))
+
+    def async_device_changed(self):
+        """Send changed data to HA"""
+        if self.__state_fingerprint() == self.__fingerprint:
+            self.__suppressed += 1
+            _LOGGER.debug("%s (%s) unchanged, not writing", self.name, self.unique_id)
+            return
+        _LOGGER.debug("%s (%s) advising HA of update", self.name, self.unique_id)
+        self.async_write_ha_state()
+
+    def async_write_ha_state(self):
+        """Write the state to HA, remembering what was written."""
+        self.__fingerprint = self.__state_fingerprint()
+        super().async_write_ha_state()
+
+
+class NSWCovidEntry(ChangeOnlyEntity, RestoreEntity, SensorEntity):
     """Represent a NSW Covid Statistic."""
 
+    _unrecorded_attributes = frozenset({ATTR_ATTRIBUTION, ATTR_PUBLISHED})
+
     def __init__(
         self,
         statistic,
+        router,
     ):
         """Set up NSW Covid entity."""
         self.__statistic = statistic
+        self.__router = router
+        self.__description = describe(statistic)
+        self.__statistic_ids = (statistic.id,)
+        self.__status = UNREAD
+        self.__state = None
 
-    def async_device_changed(self):
-        """Send changed data to HA"""
-        _LOGGER.debug("%s (%s) advising HA of update", self.name, self.unique_id)
-        self.async_schedule_update_ha_state()
+    @property
+    def description(self):
+        """Return how the statistic is presented."""
+        return self.__description
 
     @property
     def device_info(self):
         """Return the device_info of the device."""
-        return {
-            "identifiers": {(DOMAIN, self.unique_id)},
-            "name": self.name,
-            "manufacturer": MANUFACTURER,
-        }
+        return device_info(device_of(self.unique_id))
 
     @property
     def should_poll(self):
         return False
 
+    @property
+    def available(self):
+        """Return False while the source of a statistic cannot be refreshed."""
+        return self.__router.available(self.__statistic_ids)
+
     @property
     def icon(self):
-        try:
-            return self.__statistic.iconId
-        except AttributeError:
-            return "mdi:virus-outline"
+        return self.__description.icon
 
     @property
     def name(self):
         """Return the name of the device."""
-        if not self.__statistic.name:
-            return None
-        return f"{NSWHEALTH_NAME} {self.__statistic.name}"
+        return self.__description.name
 
     @property
     def unique_id(self):
         """Return the unique ID."""
-        return self.__statistic.id
+        return self.__description.key
+
+    @property
+    def statistic_ids(self):
+        """Return the ids of the statistics this entity reports."""
+        return self.__statistic_ids
 
     @property
     def unit_of_measurement(self):
         """Return the unit of measurement"""
-        if (
-            self.__statistic.typeName
-            and self.__statistic.typeName is not None
-            and self.__statistic.typeName in TIMESTAMP_TYPES
-        ):
-            return "ISO8601"
-
-        if self.__statistic.unit and self.__statistic.unit == "case":
-            return "cases"
-
-        if self.__statistic.unit and self.__statistic.unit == "death":
-            return "deaths"
-
-        if self.__statistic.unit and self.__statistic.unit == "dose":
-            return "doses"
-
-        if self.__statistic.unit and self.__statistic.unit == "test":
-            return "tests"
-
-        return self.__statistic.unit
+        return self.__description.unit
 
     @property
     def state(self):
-        """Return the sensor native value"""
-        _LOGGER.debug(
-            "%s returning state: %s", self.__statistic.id, self.__statistic.status
-        )
-        if not self.__statistic.status:
-            return None
-        if self.__statistic.typeName in TIMESTAMP_TYPES:
-            return self.__statistic.status.isoformat()
-        if self.__statistic.typeName == "integer":
-            return int(self.__statistic.status)
-        if self.__statistic.typeName == "float":
-            return float(self.__statistic.status)
-        return self.__statistic.status
+        """Return the sensor native value, only converted when it changes"""
+        status = self.__statistic.status
+        if status is not self.__status:
+            self.__state = self.__description.state(status)
+            self.__status = status
+        return self.__state
 
     @property
     def device_class(self):
         """Return the device class if relevent"""
-        if (
-            self.__statistic.typeName
-            and self.__statistic.typeName is not None
-            and self.__statistic.typeName in TIMESTAMP_TYPES
-        ):
-            return "timestamp"
-        return None
+        return self.__description.device_class
 
     @property
     def state_class(self) -> str:
         """Return the state class if relevent"""
-        measurement = getattr(self.__statistic, "measurement", False)
-        resetting = getattr(self.__statistic, "resetting", False)
-        if measurement and resetting:
-            if hasattr(sensor, "STATE_CLASS_TOTAL_INCREASING"):
-                return sensor.STATE_CLASS_TOTAL_INCREASING
-            return sensor.STATE_CLASS_MEASUREMENT
-        elif measurement:
-            return sensor.STATE_CLASS_MEASUREMENT
-        else:
-            return None
+        return self.__description.state_class
 
     # @property
     # def last_reset(self):
@@ -340,7 +229,7 @@ class NSWCovidEntry(RestoreEntity, SensorEntity):
     #     return self.__statistic.published
 
     @property
-    def device_state_attributes(self):
+    def extra_state_attributes(self):
         """Return the state attributes of the device."""
         attr = {}
         attr[ATTR_ATTRIBUTION] = self.__statistic.attribution
@@ -354,77 +243,62 @@ class NSWCovidEntry(RestoreEntity, SensorEntity):
     async def async_added_to_hass(self):
         """Register state update callback."""
         await super().async_added_to_hass()
+        self.async_on_remove(self.__router.subscribe(self.statistic_ids, self))
 
     async def async_will_remove_from_hass(self):
         """Clean up after entity before removal."""
         await super().async_will_remove_from_hass()
 
 
-class NSWCovidDeaths(RestoreEntity):
+class NSWCovidDeaths(ChangeOnlyEntity, RestoreEntity, SensorEntity):
     """Represent a NSW Covid Deaths Sensor."""
 
+    _unrecorded_attributes = frozenset({ATTR_ATTRIBUTION, *layout(ATTR_LIVES_LOST)[0]})
+
     def __init__(
         self,
         statistics,
+        router,
     ):
         """Set up NSW Covid entity."""
         self.__statistics = statistics
+        self.__router = router
         self.__id = ATTR_LIVES_LOST
-        self.__tracked = [
-            ATTR_LIVES_LOST_FEMALE_0_9,
-            ATTR_LIVES_LOST_FEMALE_10_19,
-            ATTR_LIVES_LOST_FEMALE_20_29,
-            ATTR_LIVES_LOST_FEMALE_30_39,
-            ATTR_LIVES_LOST_FEMALE_40_49,
-            ATTR_LIVES_LOST_FEMALE_50_59,
-            ATTR_LIVES_LOST_FEMALE_60_69,
-            ATTR_LIVES_LOST_FEMALE_70_79,
-            ATTR_LIVES_LOST_FEMALE_80_89,
-            ATTR_LIVES_LOST_FEMALE_90_PLUS,
-            ATTR_LIVES_LOST_MALE_0_9,
-            ATTR_LIVES_LOST_MALE_10_19,
-            ATTR_LIVES_LOST_MALE_20_29,
-            ATTR_LIVES_LOST_MALE_30_39,
-            ATTR_LIVES_LOST_MALE_40_49,
-            ATTR_LIVES_LOST_MALE_50_59,
-            ATTR_LIVES_LOST_MALE_60_69,
-            ATTR_LIVES_LOST_MALE_70_79,
-            ATTR_LIVES_LOST_MALE_80_89,
-            ATTR_LIVES_LOST_MALE_90_PLUS,
-        ]
+        self.__buckets = AgeSexBuckets(ATTR_LIVES_LOST)
+        self.__recount()
+
+    def __recount(self):
+        """Rebuild the buckets from every child statistic"""
+        self.__buckets.clear()
+        self.__attribution = None
+        self.__attributes = None
+        for statistic_id in self.__buckets.keys:
+            if statistic_id in self.__statistics:
+                self.async_statistic_changed(self.__statistics[statistic_id])
 
-    def async_device_changed(self):
-        """Send changed data to HA"""
-        _LOGGER.debug("%s (%s) advising HA of update", self.name, self.unique_id)
-        self.async_schedule_update_ha_state()
-
-    def event_listener(self, payload):
-        """Checks for updates to child stats"""
-        if not (
-            payload.event_type
-            and payload.id
-            and payload.event_type == "statistic_updated"
-        ):
-            return None
-        if not payload.id in self.__tracked:
-            return None
-        self.async_device_changed()
-        return True
+    def async_statistic_changed(self, statistic):
+        """Apply a changed child statistic to its bucket"""
+        if self.__buckets.set(statistic.id, getattr(statistic, "status", None)):
+            self.__attributes = None
+        if not self.__attribution:
+            self.__attribution = getattr(statistic, "attribution", None)
+            self.__attributes = None
 
     @property
     def device_info(self):
         """Return the device_info of the device."""
-        return {
-            "identifiers": {(DOMAIN, self.unique_id)},
-            "name": self.name,
-            "manufacturer": MANUFACTURER,
-        }
+        return device_info(device_of(self.unique_id))
 
     @property
     def should_poll(self):
         """The device should not poll"""
         return False
 
+    @property
+    def available(self):
+        """Return False while the source of a statistic cannot be refreshed."""
+        return self.__router.available(self.statistic_ids)
+
     @property
     def icon(self):
         """Return the device icon"""
@@ -440,6 +314,16 @@ class NSWCovidDeaths(RestoreEntity):
         """Return the unique ID."""
         return self.__id
 
+    @property
+    def statistic_ids(self):
+        """Return the ids of the statistics this entity reports."""
+        return self.__buckets.keys
+
+    @property
+    def buckets(self):
+        """Return the age and sex buckets behind the total."""
+        return self.__buckets
+
     @property
     def unit_of_measurement(self):
         """Return the unit of measurement"""
@@ -448,15 +332,7 @@ class NSWCovidDeaths(RestoreEntity):
     @property
     def state(self):
         """Return the sensor state"""
-        deaths = 0
-        for statistic_id in self.__tracked:
-            _LOGGER.debug("Counting deaths %s", statistic_id)
-            if statistic_id in self.__statistics:
-                statistic = self.__statistics[statistic_id]
-                status = getattr(statistic, "status", 0)
-                deaths += status
-        _LOGGER.debug("%s returning state: %s", self.__id, deaths)
-        return deaths
+        return self.__buckets.total
 
     @property
     def device_class(self):
@@ -466,29 +342,20 @@ class NSWCovidDeaths(RestoreEntity):
     @property
     def state_class(self):
         """Return the state class if relevent"""
-        return sensor.STATE_CLASS_MEASUREMENT
+        return STATE_CLASS_CUMULATIVE
 
     @property
-    def device_state_attributes(self):
+    def extra_state_attributes(self):
         """Return the state attributes of the device."""
-        attr = {}
-        attr[ATTR_ATTRIBUTION] = None
-        for statistic_id in self.__tracked:
-            _LOGGER.debug("Attributes checking %s", statistic_id)
-            if statistic_id in self.__statistics:
-                statistic = self.__statistics[statistic_id]
-                status = getattr(statistic, "status", 0)
-                if not attr[ATTR_ATTRIBUTION]:
-                    attribution = getattr(statistic, "attribution", None)
-                    if attribution:
-                        attr[ATTR_ATTRIBUTION] = attribution
-                _LOGGER.debug("Attributes status %s: %s", statistic_id, status)
-                attr[statistic_id] = status
-        return attr
+        if self.__attributes is None:
+            attr = {ATTR_ATTRIBUTION: self.__attribution}
+            attr.update(self.__buckets.items())
+            self.__attributes = MappingProxyType(attr)
+        return self.__attributes
 
     async def async_update(self):
         """Update NSW Covid Data"""
-        for statistic_id in self.__tracked:
+        for statistic_id in self.__buckets.keys:
             statistic = getattr(self.__statistics, statistic_id, None)
             if statistic:
                 await statistic.refresh()
@@ -496,77 +363,67 @@ class NSWCovidDeaths(RestoreEntity):
     async def async_added_to_hass(self):
         """Register state update callback."""
         await super().async_added_to_hass()
+        self.__recount()
+        self.async_on_remove(
+            self.__router.subscribe(
+                self.statistic_ids, self, self.async_statistic_changed
+            )
+        )
 
     async def async_will_remove_from_hass(self):
         """Clean up after entity before removal."""
         await super().async_will_remove_from_hass()
 
 
-class NSWCovidCases(RestoreEntity):
+class NSWCovidCases(ChangeOnlyEntity, RestoreEntity, SensorEntity):
     """Represent a NSW Covid Cases Sensor."""
 
+    _unrecorded_attributes = frozenset({ATTR_ATTRIBUTION, *layout(ATTR_CASES)[0]})
+
     def __init__(
         self,
         statistics,
+        router,
     ):
         """Set up NSW Covid Cases entity."""
         self.__statistics = statistics
+        self.__router = router
         self.__id = ATTR_CASES
-        self.__tracked = [
-            ATTR_CASES_FEMALE_0_9,
-            ATTR_CASES_FEMALE_10_19,
-            ATTR_CASES_FEMALE_20_29,
-            ATTR_CASES_FEMALE_30_39,
-            ATTR_CASES_FEMALE_40_49,
-            ATTR_CASES_FEMALE_50_59,
-            ATTR_CASES_FEMALE_60_69,
-            ATTR_CASES_FEMALE_70_79,
-            ATTR_CASES_FEMALE_80_89,
-            ATTR_CASES_FEMALE_90_PLUS,
-            ATTR_CASES_MALE_0_9,
-            ATTR_CASES_MALE_10_19,
-            ATTR_CASES_MALE_20_29,
-            ATTR_CASES_MALE_30_39,
-            ATTR_CASES_MALE_40_49,
-            ATTR_CASES_MALE_50_59,
-            ATTR_CASES_MALE_60_69,
-            ATTR_CASES_MALE_70_79,
-            ATTR_CASES_MALE_80_89,
-            ATTR_CASES_MALE_90_PLUS,
-        ]
+        self.__buckets = AgeSexBuckets(ATTR_CASES)
+        self.__recount()
+
+    def __recount(self):
+        """Rebuild the buckets from every child statistic"""
+        self.__buckets.clear()
+        self.__attribution = None
+        self.__attributes = None
+        for statistic_id in self.__buckets.keys:
+            if statistic_id in self.__statistics:
+                self.async_statistic_changed(self.__statistics[statistic_id])
 
-    def async_device_changed(self):
-        """Send changed data to HA"""
-        _LOGGER.debug("%s (%s) advising HA of update", self.name, self.unique_id)
-        self.async_schedule_update_ha_state()
-
-    def event_listener(self, payload):
-        """Checks for updates to child stats"""
-        if not (
-            payload.event_type
-            and payload.id
-            and payload.event_type == "statistic_updated"
-        ):
-            return None
-        if not payload.id in self.__tracked:
-            return None
-        self.async_device_changed()
-        return True
+    def async_statistic_changed(self, statistic):
+        """Apply a changed child statistic to its bucket"""
+        if self.__buckets.set(statistic.id, getattr(statistic, "status", None)):
+            self.__attributes = None
+        if not self.__attribution:
+            self.__attribution = getattr(statistic, "attribution", None)
+            self.__attributes = None
 
     @property
     def device_info(self):
         """Return the device_info of the device."""
-        return {
-            "identifiers": {(DOMAIN, self.unique_id)},
-            "name": self.name,
-            "manufacturer": MANUFACTURER,
-        }
+        return device_info(device_of(self.unique_id))
 
     @property
     def should_poll(self):
         """The device should not poll"""
         return False
 
+    @property
+    def available(self):
+        """Return False while the source of a statistic cannot be refreshed."""
+        return self.__router.available(self.statistic_ids)
+
     @property
     def icon(self):
         """Return the device icon"""
@@ -582,6 +439,16 @@ class NSWCovidCases(RestoreEntity):
         """Return the unique ID."""
         return self.__id
 
+    @property
+    def statistic_ids(self):
+        """Return the ids of the statistics this entity reports."""
+        return self.__buckets.keys
+
+    @property
+    def buckets(self):
+        """Return the age and sex buckets behind the total."""
+        return self.__buckets
+
     @property
     def unit_of_measurement(self):
         """Return the unit of measurement"""
@@ -590,15 +457,7 @@ class NSWCovidCases(RestoreEntity):
     @property
     def state(self):
         """Return the sensor state"""
-        cases = 0
-        for statistic_id in self.__tracked:
-            _LOGGER.debug("Counting cases %s", statistic_id)
-            if statistic_id in self.__statistics:
-                statistic = self.__statistics[statistic_id]
-                status = getattr(statistic, "status", 0)
-                cases += status
-        _LOGGER.debug("%s returning state: %s", self.__id, cases)
-        return cases
+        return self.__buckets.total
 
     @property
     def device_class(self):
@@ -608,29 +467,20 @@ class NSWCovidCases(RestoreEntity):
     @property
     def state_class(self):
         """Return the state class if relevent"""
-        return sensor.STATE_CLASS_MEASUREMENT
+        return STATE_CLASS_CUMULATIVE
 
     @property
-    def device_state_attributes(self):
+    def extra_state_attributes(self):
         """Return the state attributes of the device."""
-        attr = {}
-        attr[ATTR_ATTRIBUTION] = None
-        for statistic_id in self.__tracked:
-            _LOGGER.debug("Attributes checking %s", statistic_id)
-            if statistic_id in self.__statistics:
-                statistic = self.__statistics[statistic_id]
-                status = getattr(statistic, "status", 0)
-                if not attr[ATTR_ATTRIBUTION]:
-                    attribution = getattr(statistic, "attribution", None)
-                    if attribution:
-                        attr[ATTR_ATTRIBUTION] = attribution
-                _LOGGER.debug("Attributes status %s: %s", statistic_id, status)
-                attr[statistic_id] = status
-        return attr
+        if self.__attributes is None:
+            attr = {ATTR_ATTRIBUTION: self.__attribution}
+            attr.update(self.__buckets.items())
+            self.__attributes = MappingProxyType(attr)
+        return self.__attributes
 
     async def async_update(self):
         """Update NSW Covid Data"""
-        for statistic_id in self.__tracked:
+        for statistic_id in self.__buckets.keys:
             statistic = getattr(self.__statistics, statistic_id, None)
             if statistic:
                 await statistic.refresh()
@@ -638,57 +488,50 @@ class NSWCovidCases(RestoreEntity):
     async def async_added_to_hass(self):
         """Register state update callback."""
         await super().async_added_to_hass()
+        self.__recount()
+        self.async_on_remove(
+            self.__router.subscribe(
+                self.statistic_ids, self, self.async_statistic_changed
+            )
+        )
 
     async def async_will_remove_from_hass(self):
         """Clean up after entity before removal."""
         await super().async_will_remove_from_hass()
 
 
-class NSWCovidDoses(RestoreEntity):
+class NSWCovidDoses(ChangeOnlyEntity, RestoreEntity, SensorEntity):
     """Represent a NSW Covid Dose Sensor."""
 
+    _unrecorded_attributes = frozenset({ATTR_ATTRIBUTION})
+
     def __init__(
         self,
         statistics,
+        router,
     ):
         """Set up NSW Covid Cases entity."""
         self.__statistics = statistics
+        self.__router = router
         self.__id = ATTR_DOSES
-        self.__tracked = [
+        self.__tracked = (
             ATTR_NSW_HEALTH_DOSES_DAILY,
             ATTR_NSW_HEALTH_DOSES_CUMULATIVE,
             ATTR_GP_NETWORK_DOSES_CUMULATIVE,
             ATTR_NSW_HEALTH_DOSES_UPDATED,
             ATTR_GP_NETWORK_DOSES_UPDATED,
             ATTR_ALL_PROVIDERS_DOSES_CUMULATIVE,
-        ]
+        )
+        self.__attributes = None
 
-    def async_device_changed(self):
-        """Send changed data to HA"""
-        _LOGGER.debug("%s (%s) advising HA of update", self.name, self.unique_id)
-        self.async_schedule_update_ha_state()
-
-    def event_listener(self, payload):
-        """Checks for updates to child stats"""
-        if not (
-            payload.event_type
-            and payload.id
-            and payload.event_type == "statistic_updated"
-        ):
-            return None
-        if not payload.id in self.__tracked:
-            return None
-        self.async_device_changed()
-        return True
+    def async_statistic_changed(self, statistic):
+        """Rebuild the attributes when next read"""
+        self.__attributes = None
 
     @property
     def device_info(self):
         """Return the device_info of the device."""
-        return {
-            "identifiers": {(DOMAIN, self.unique_id)},
-            "name": self.name,
-            "manufacturer": MANUFACTURER,
-        }
+        return device_info(device_of(self.unique_id))
 
     @property
     def should_poll(self):
@@ -710,6 +553,11 @@ class NSWCovidDoses(RestoreEntity):
         """Return the unique ID."""
         return self.__id
 
+    @property
+    def statistic_ids(self):
+        """Return the ids of the statistics this entity reports."""
+        return self.__tracked
+
     @property
     def unit_of_measurement(self):
         """Return the unit of measurement"""
@@ -720,7 +568,7 @@ class NSWCovidDoses(RestoreEntity):
         """Return the sensor available flag"""
         if not ATTR_ALL_PROVIDERS_DOSES_CUMULATIVE in self.__statistics:
             return False
-        return True
+        return self.__router.available(self.statistic_ids)
 
     @property
     def state(self):
@@ -735,25 +583,27 @@ class NSWCovidDoses(RestoreEntity):
         return None
 
     @property
-    def device_state_attributes(self):
+    def state_class(self):
+        """Return the state class if relevent"""
+        return STATE_CLASS_CUMULATIVE
+
+    @property
+    def extra_state_attributes(self):
         """Return the state attributes of the device."""
-        attr = {}
-        attr[ATTR_ATTRIBUTION] = None
-        for statistic_id in self.__tracked:
-            _LOGGER.debug("Attributes checking %s", statistic_id)
-            if (
-                statistic_id in self.__statistics
-                and statistic_id != ATTR_ALL_PROVIDERS_DOSES_CUMULATIVE
-            ):
+        if self.__attributes is None:
+            attr = {ATTR_ATTRIBUTION: None}
+            for statistic_id in self.__tracked:
+                if (
+                    statistic_id not in self.__statistics
+                    or statistic_id == ATTR_ALL_PROVIDERS_DOSES_CUMULATIVE
+                ):
+                    continue
                 statistic = self.__statistics[statistic_id]
-                status = getattr(statistic, "status", 0)
                 if not attr[ATTR_ATTRIBUTION]:
-                    attribution = getattr(statistic, "attribution", None)
-                    if attribution:
-                        attr[ATTR_ATTRIBUTION] = attribution
-                _LOGGER.debug("Attributes status %s: %s", statistic_id, status)
-                attr[statistic_id] = status
-        return attr
+                    attr[ATTR_ATTRIBUTION] = getattr(statistic, "attribution", None)
+                attr[statistic_id] = getattr(statistic, "status", 0)
+            self.__attributes = MappingProxyType(attr)
+        return self.__attributes
 
     async def async_update(self):
         """Update NSW Covid Dose Data"""
@@ -765,7 +615,189 @@ class NSWCovidDoses(RestoreEntity):
     async def async_added_to_hass(self):
         """Register state update callback."""
         await super().async_added_to_hass()
+        self.__attributes = None
+        self.async_on_remove(
+            self.__router.subscribe(
+                self.statistic_ids, self, self.async_statistic_changed
+            )
+        )
 
     async def async_will_remove_from_hass(self):
         """Clean up after entity before removal."""
         await super().async_will_remove_from_hass()
+
+
+class NSWCovidTrend(ChangeOnlyEntity, RestoreEntity, SensorEntity):
+    """Represent a trend in a NSW Covid Statistic over recent publications."""
+
+    _unrecorded_attributes = frozenset({ATTR_ATTRIBUTION, ATTR_PUBLISHED})
+
+    def __init__(
+        self,
+        statistic,
+        history,
+        trend,
+    ):
+        """Set up NSW Covid trend entity."""
+        self.__statistic = statistic
+        self.__history = history
+        self.__trend = trend
+
+    @property
+    def device_info(self):
+        """Return the device_info of the device."""
+        return device_info(device_of(self.unique_id))
+
+    @property
+    def should_poll(self):
+        """The device should not poll"""
+        return False
+
+    @property
+    def icon(self):
+        """Return the device icon"""
+        if self.__trend == TREND_AVERAGE:
+            return "mdi:chart-bell-curve-cumulative"
+        return "mdi:trending-up"
+
+    @property
+    def name(self):
+        """Return the name of the device."""
+        if self.__trend == TREND_AVERAGE:
+            suffix = "7 Day Average"
+        elif self.__trend == TREND_DAY_OVER_DAY:
+            suffix = "Day Over Day"
+        else:
+            suffix = "Week Over Week"
+        return f"{NSWHEALTH_NAME} {self.__statistic.name} {suffix}"
+
+    @property
+    def unique_id(self):
+        """Return the unique ID."""
+        return f"{self.__statistic.id}_{self.__trend}"
+
+    @property
+    def statistic_ids(self):
+        """Return the ids of the statistics this entity reports."""
+        return (self.__statistic.id,)
+
+    @property
+    def unit_of_measurement(self):
+        """Return the unit of measurement"""
+        if self.__trend == TREND_WEEK_OVER_WEEK:
+            return PERCENTAGE
+        if self.__statistic.unit in ("case", "death", "dose", "test"):
+            return f"{self.__statistic.unit}s"
+        return self.__statistic.unit
+
+    @property
+    def state(self):
+        """Return the sensor state"""
+        series = self.__history.series(self.__statistic.id)
+        if self.__trend == TREND_AVERAGE:
+            value = series.average
+        elif self.__trend == TREND_DAY_OVER_DAY:
+            value = series.delta
+        else:
+            value = series.growth
+        if value is None:
+            return None
+        return round(value, 2)
+
+    @property
+    def state_class(self):
+        """Return the state class if relevent"""
+        return STATE_CLASS_MEASUREMENT
+
+    @property
+    def extra_state_attributes(self):
+        """Return the state attributes of the device."""
+        days = self.__history.days
+        return {
+            ATTR_ATTRIBUTION: self.__statistic.attribution,
+            ATTR_PUBLISHED: days[-1].isoformat() if days else None,
+        }
+
+    async def async_added_to_hass(self):
+        """Register state update callback."""
+        await super().async_added_to_hass()
+        self.async_on_remove(self.__history.subscribe(self))
+
+
+class NSWCovidDiagnostic(ChangeOnlyEntity, SensorEntity):
+    """Represent how recent refreshes of NSW Covid Statistics performed."""
+
+    _unrecorded_attributes = frozenset({"buckets"})
+
+    def __init__(
+        self,
+        metrics,
+        metric,
+    ):
+        """Set up NSW Covid diagnostic entity."""
+        self.__metrics = metrics
+        self.__metric = metric
+        self.__name, self.__unit, self.__icon = DIAGNOSTIC_SENSORS[metric]
+
+    @property
+    def device_info(self):
+        """Return the device_info of the device."""
+        return device_info(device_of(self.unique_id))
+
+    @property
+    def should_poll(self):
+        """The device should not poll"""
+        return False
+
+    @property
+    def entity_registry_enabled_default(self):
+        """Diagnostics are only wanted when investigating"""
+        return False
+
+    @property
+    def entity_category(self):
+        """Return the entity category"""
+        return ENTITY_CATEGORY_DIAGNOSTIC
+
+    @property
+    def icon(self):
+        """Return the device icon"""
+        return self.__icon
+
+    @property
+    def name(self):
+        """Return the name of the device."""
+        return f"{NSWHEALTH_NAME} {self.__name}"
+
+    @property
+    def unique_id(self):
+        """Return the unique ID."""
+        return f"diagnostic_{self.__metric}"
+
+    @property
+    def unit_of_measurement(self):
+        """Return the unit of measurement"""
+        return self.__unit
+
+    @property
+    def state(self):
+        """Return the sensor state"""
+        return self.__metrics.last(self.__metric)
+
+    @property
+    def state_class(self):
+        """Return the state class if relevent"""
+        return STATE_CLASS_MEASUREMENT
+
+    @property
+    def extra_state_attributes(self):
+        """Return the recent histogram of the metric."""
+        histogram = self.__metrics.histogram(self.__metric)
+        if not histogram:
+            return None
+        return {"buckets": histogram["buckets"]}
+
+    async def async_added_to_hass(self):
+        """Register state update callback."""
+        await super().async_added_to_hass()
+        self.async_on_remove(self.__metrics.subscribe(self))
@@ -0,0 +1,59 @@
+"""A compact snapshot of the NSW Covid statistics, shared over HTTP.
+
+One fetcher (manage/fetcher.py) scrapes NSW Health and serves the snapshot,
+and any number of Home Assistant instances read it instead of scraping. A
+snapshot is a JSON object holding the format version and the value of every
+statistic that has one, keyed by statistic id, with timestamps as ISO 8601.
+"""
+from datetime import datetime
+import hashlib
+import json
+
+from .const import TIMESTAMP_TYPES
+
+SNAPSHOT_FORMAT = 1
+
+
+def document(statistics):
+    """Return the snapshot of statistics as compact JSON bytes."""
+    values = {}
+    for statistic_id, statistic in statistics.items():
+        value = statistic.status
+        if value is None:
+            continue
+        values[statistic_id] = (
+            value.isoformat() if isinstance(value, datetime) else value
+        )
+    return json.dumps(
+        {"format": SNAPSHOT_FORMAT, "statistics": values},
+        separators=(",", ":"),
+        sort_keys=True,
+    ).encode()
+
+
+def etag(body):
+    """Return a strong ETag for a snapshot document."""
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def read(body, statistics):
+    """Return a mapping of statistic id to value from a snapshot document.
+
+    Raises ValueError when body is not a snapshot this version understands.
+    """
+    try:
+        data = json.loads(body)
+        stored = data["statistics"]
+    except (KeyError, TypeError) as err:
+        raise ValueError(f"Not a snapshot: {err}") from err
+    if data.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"Unsupported snapshot format {data.get('format')}")
+    values = {}
+    for statistic in statistics:
+        value = stored.get(statistic.id)
+        if value is None:
+            continue
+        if statistic.typeName in TIMESTAMP_TYPES:
+            value = datetime.fromisoformat(value)
+        values[statistic.id] = value
+    return values
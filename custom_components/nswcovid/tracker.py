@@ -0,0 +1,596 @@
+"""Conditional refresh of NSW Covid statistics."""
+import asyncio
+from datetime import datetime
+import hashlib
+import logging
+import time
+
+import aiohttp
+
+from .const import (
+    ATTR_PUBLISHED,
+    FETCH_CHUNK_SIZE,
+    FETCH_CONNECT_TIMEOUT,
+    FETCH_READ_TIMEOUT,
+    FETCH_TOTAL_TIMEOUT,
+    NSWHEALTH_HOST,
+    NSWHEALTH_PATH,
+    SNAPSHOT_SAVE_DELAY,
+    TIMESTAMP_TYPES,
+)
+from .derived import DERIVED_STATISTICS, DerivedGraph
+from .metrics import (
+    METRIC_BYTES,
+    METRIC_CHANGED,
+    METRIC_DISPATCH,
+    METRIC_ERRORS,
+    METRIC_FETCH,
+    METRIC_PARSE,
+    METRIC_UPDATES,
+    METRIC_WRITE,
+    RefreshMetrics,
+)
+from .opendata import FORMAT_JSON, OpenDataExtractor, detect
+from .parser import (
+    StreamingExtractor,
+    compile_path,
+    extract,
+    preload as preload_parsers,
+)
+from .router import StatisticRouter
+from .snapshot import read as read_snapshot
+
+_LOGGER = logging.getLogger(__name__)
+
+try:
+    import brotli  # noqa: F401
+
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+FETCH_TIMEOUT = aiohttp.ClientTimeout(
+    total=FETCH_TOTAL_TIMEOUT,
+    connect=FETCH_CONNECT_TIMEOUT,
+    sock_read=FETCH_READ_TIMEOUT,
+)
+
+
+def preload():
+    """Import the statistics library, which is slow to import."""
+    import nswcovid.protocol.data_sources  # noqa: F401
+    import nswcovid.protocol.statistics  # noqa: F401
+
+
+class StatisticSource:
+    """An upstream document that one or more statistics are read from."""
+
+    def __init__(self, url):
+        """Set up the source."""
+        self.url = url
+        self.statistics = []
+        self.active = self.statistics
+        self.covered = ()
+        self.timeout = FETCH_TIMEOUT
+        self.available = True
+        self.etag = None
+        self.last_modified = None
+        self.digest = None
+        self.received = 0
+        self.fetch_time = 0.0
+        self.parse_time = 0.0
+
+    @property
+    def streaming(self):
+        """Return True if every active statistic can be extracted while streaming."""
+        return bool(self.active) and all(
+            compile_path(statistic) is not None for statistic in self.active
+        )
+
+    def enable(self, statistic_ids):
+        """Only extract the statistics in statistic_ids, or all when it is None."""
+        if statistic_ids is None:
+            self.active = self.statistics
+        else:
+            self.active = [
+                statistic
+                for statistic in self.statistics
+                if statistic.id in statistic_ids
+            ]
+
+    async def fetch(self, session):
+        """Return values if the document changed since it was last applied, otherwise None.
+
+        The whole body is hashed before anything is parsed, so an unchanged
+        document is never parsed. A changed one is fed to its extractor a
+        chunk at a time, stopping once every statistic has been read.
+        """
+        # Validators taken without a statistic say nothing about its value
+        if not {statistic.id for statistic in self.active} <= set(self.covered):
+            self.etag = self.last_modified = self.digest = None
+
+        headers = {"Accept-Encoding": ACCEPT_ENCODING}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+
+        hasher = hashlib.sha256()
+        body = []
+        started = time.perf_counter()
+        self.received = 0
+        self.parse_time = 0.0
+        async with session.get(
+            self.url, headers=headers, timeout=self.timeout
+        ) as response:
+            if response.status == 304:
+                _LOGGER.debug("%s not modified", self.url)
+                self.fetch_time = time.perf_counter() - started
+                return None
+            response.raise_for_status()
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            async for chunk in response.content.iter_chunked(FETCH_CHUNK_SIZE):
+                self.received += len(chunk)
+                hasher.update(chunk)
+                body.append(chunk)
+
+        digest = hasher.hexdigest()
+        self.fetch_time = time.perf_counter() - started
+        if digest == self.digest:
+            _LOGGER.debug("%s content unchanged", self.url)
+            self.etag = etag
+            self.last_modified = last_modified
+            return None
+
+        parsing = time.perf_counter()
+        extractor = self.extractor()
+        if extractor is not None:
+            for chunk in body:
+                extractor.feed(chunk)
+                if extractor.complete:
+                    _LOGGER.debug("%s all statistics read", self.url)
+                    break
+            values = extractor.close()
+        else:
+            values = self.parse(b"".join(body))
+        self.parse_time = time.perf_counter() - parsing
+        return values, etag, last_modified, digest
+
+    def extractor(self):
+        """Return an extractor to feed the document to as it streams in, or None."""
+        return StreamingExtractor(self.active) if self.streaming else None
+
+    def parse(self, body):
+        """Return a mapping of statistic id to value found in a whole document."""
+        return extract(self.active, body)
+
+    def apply(self, fetched):
+        """Push values from a changed document onto the statistics."""
+        values, etag, last_modified, digest = fetched
+        retrieved = datetime.now()
+        for statistic in self.active:
+            if statistic.id not in values:
+                continue
+            statistic.status = values[statistic.id]
+            statistic.updated = retrieved
+        self.covered = tuple(statistic.id for statistic in self.active)
+        self.etag = etag
+        self.last_modified = last_modified
+        self.digest = digest
+        return len(values)
+
+
+class SnapshotSource(StatisticSource):
+    """A snapshot served by a shared fetcher, read in place of NSW Health."""
+
+    @property
+    def streaming(self):
+        """Return False, snapshots are small enough to read whole."""
+        return False
+
+    def parse(self, body):
+        """Return a mapping of statistic id to value in the snapshot."""
+        return read_snapshot(body, self.active)
+
+
+class OpenDataSource(StatisticSource):
+    """A structured dataset, read in preference to scraping NSW Health."""
+
+    def __init__(self, url):
+        """Set up the source."""
+        super().__init__(url)
+        self.provided = frozenset()
+
+    @property
+    def streaming(self):
+        """Return True unless the dataset is JSON, which has to be read whole."""
+        return detect(self.url) != FORMAT_JSON
+
+    def extractor(self):
+        """Return an extractor that keeps the latest row of the dataset."""
+        return OpenDataExtractor(self.active, detect(self.url))
+
+    def apply(self, fetched):
+        """Push values onto the statistics, noting which the dataset provides."""
+        self.provided = frozenset(fetched[0])
+        return super().apply(fetched)
+
+
+class StatisticTracker:
+    """Refresh statistics, only parsing documents that actually changed."""
+
+    def __init__(
+        self,
+        loop,
+        session,
+        store=None,
+        statistic_ids=None,
+        snapshot_url=None,
+        open_data_url=None,
+    ):
+        """Set up the tracker using a shared aiohttp session.
+
+        When a store is given, a snapshot is saved to it after every refresh
+        that changed something. When statistic_ids is given only those
+        statistics, the published timestamp and the inputs of any derived
+        ones are tracked, and sources none of them are read from are never
+        fetched. When a snapshot_url is given, every statistic is read from
+        the snapshot a shared fetcher serves there instead. Otherwise, when an
+        open_data_url is given, the dataset there is read first and only the
+        statistics it does not provide are scraped, falling back to scraping
+        everything whenever it cannot be read. The statistics library is
+        imported here rather than with the module, call preload() in the
+        executor first to keep the import off the event loop.
+        """
+        from nswcovid.protocol.data_sources import DATA_SOURCES
+        from nswcovid.protocol.statistics import Statistic
+
+        self.__loop = loop
+        self.__session = session
+        self.__store = store
+        self.__router = StatisticRouter()
+        self.__metrics = RefreshMetrics()
+        self.__event_listeners = [self.__router.dispatch]
+        self.__failed = False
+        self.__publication_failed = False
+        self.__parsers = False
+        self.__enabled = None
+        self.__statistics = {}
+        self.__sources = {}
+        self.__open_data = None
+        if open_data_url and not snapshot_url:
+            self.__open_data = OpenDataSource(open_data_url)
+        definitions = DERIVED_STATISTICS
+        if statistic_ids is not None:
+            wanted = {ATTR_PUBLISHED, *statistic_ids}
+            definitions = {
+                statistic_id: data
+                for statistic_id, data in DERIVED_STATISTICS.items()
+                if statistic_id in wanted
+            }
+            for data in definitions.values():
+                wanted.update(data["inputs"])
+        for statistic_id, data in DATA_SOURCES.items():
+            if statistic_ids is not None and statistic_id not in wanted:
+                continue
+            statistic = Statistic(
+                handler=self,
+                id=statistic_id,
+                data=data,
+                event_listeners=self.__event_listeners,
+            )
+            self.__statistics[statistic_id] = statistic
+            if snapshot_url:
+                url = snapshot_url
+                source = SnapshotSource
+            else:
+                host = statistic.host or NSWHEALTH_HOST
+                path = statistic.path or NSWHEALTH_PATH
+                url = f"https://{host}/{path}"
+                source = StatisticSource
+            if url not in self.__sources:
+                self.__sources[url] = source(url)
+            self.__sources[url].statistics.append(statistic)
+            if self.__open_data is not None:
+                self.__open_data.statistics.append(statistic)
+        self.__derived = DerivedGraph(
+            self, dict(self.__statistics), self.__event_listeners, definitions
+        )
+        self.__statistics.update(self.__derived.statistics)
+        self.__event_listeners.append(self.__derived.dispatch)
+
+    @property
+    def loop(self):
+        """Return the event loop statistics broadcast on."""
+        return self.__loop
+
+    @property
+    def statistics(self):
+        """Return the statistics keyed by id."""
+        return self.__statistics
+
+    @property
+    def router(self):
+        """Return the router entities subscribe to for updates."""
+        return self.__router
+
+    @property
+    def derived(self):
+        """Return the graph of statistics derived from the published ones."""
+        return self.__derived
+
+    @property
+    def metrics(self):
+        """Return timings and counts from recent refreshes."""
+        return self.__metrics
+
+    @property
+    def sources(self):
+        """Return the upstream sources being tracked, any open data first."""
+        sources = list(self.__sources.values())
+        if self.__open_data is not None:
+            sources.insert(0, self.__open_data)
+        return sources
+
+    @property
+    def failed(self):
+        """Return True if any source failed during the last refresh."""
+        return self.__failed
+
+    @property
+    def publication_failed(self):
+        """Return True if the published timestamp could not be refreshed."""
+        return self.__publication_failed
+
+    @property
+    def enabled(self):
+        """Return the ids of the statistics being refreshed, None if all are."""
+        return self.__enabled
+
+    def enable(self, statistic_ids):
+        """Only refresh the statistics in statistic_ids, or all when it is None.
+
+        The published timestamp, and the inputs of any derived statistic, are
+        always refreshed with them. Statistics left out are not extracted, so
+        never change or emit events, and a source none are read from is not
+        fetched.
+        """
+        if statistic_ids is not None:
+            enabled = {ATTR_PUBLISHED}
+            pending = list(statistic_ids)
+            while pending:
+                statistic_id = pending.pop()
+                if statistic_id in enabled or statistic_id not in self.__statistics:
+                    continue
+                enabled.add(statistic_id)
+                pending.extend(self.__derived.inputs(statistic_id))
+            statistic_ids = frozenset(enabled)
+        self.__enabled = statistic_ids
+        for source in self.sources:
+            source.enable(statistic_ids)
+        self.__derived.enable(statistic_ids)
+        _LOGGER.debug(
+            "Refreshing %s statistics",
+            "all" if statistic_ids is None else len(statistic_ids),
+        )
+
+    @property
+    def published(self):
+        """Return the published timestamp of the current statistics."""
+        statistic = self.__statistics.get(ATTR_PUBLISHED)
+        if not statistic:
+            return None
+        return statistic.status
+
+    def addListener(self, event_listener):
+        """Add a listener for every statistic event."""
+        if event_listener not in self.__event_listeners:
+            self.__event_listeners.append(event_listener)
+        return event_listener
+
+    def removeListener(self, event_listener):
+        """Remove a previously added listener."""
+        if event_listener not in self.__event_listeners:
+            return False
+        self.__event_listeners.remove(event_listener)
+        return True
+
+    def snapshot(self):
+        """Return the current statistics and source validators for storage."""
+        statistics = {}
+        for statistic_id, statistic in self.__statistics.items():
+            if statistic.status is None:
+                continue
+            statistics[statistic_id] = {
+                "status": _serialize(statistic.status),
+                "updated": _serialize(statistic.updated),
+            }
+        sources = {
+            source.url: {
+                "etag": source.etag,
+                "last_modified": source.last_modified,
+                "digest": source.digest,
+                "statistics": list(source.covered),
+            }
+            for source in self.__sources.values()
+            if source.digest
+        }
+        return {"statistics": statistics, "sources": sources}
+
+    def restore(self, snapshot):
+        """Populate statistics from a stored snapshot, returns True if any were."""
+        if not snapshot:
+            return False
+        restored = 0
+        for statistic_id, stored in snapshot.get("statistics", {}).items():
+            statistic = self.__statistics.get(statistic_id)
+            if not statistic:
+                continue
+            try:
+                status = stored["status"]
+                if statistic.typeName in TIMESTAMP_TYPES:
+                    status = datetime.fromisoformat(status)
+                statistic.status = status
+                if stored.get("updated"):
+                    statistic.updated = datetime.fromisoformat(stored["updated"])
+            except (KeyError, TypeError, ValueError) as err:
+                _LOGGER.warning("Unable to restore %s: %s", statistic_id, err)
+                continue
+            restored += 1
+        for url, stored in snapshot.get("sources", {}).items():
+            source = self.__sources.get(url)
+            if not source:
+                continue
+            # Validators stored before they recorded what they cover are dropped
+            if "statistics" not in stored:
+                continue
+            source.covered = tuple(stored["statistics"])
+            source.etag = stored.get("etag")
+            source.last_modified = stored.get("last_modified")
+            source.digest = stored.get("digest")
+        _LOGGER.debug("Restored %d statistics from snapshot", restored)
+        return restored > 0
+
+    async def details(self, id):
+        """Refresh and return a single statistic."""
+        await self.refresh()
+        return self.__statistics.get(id)
+
+    async def refresh(self):
+        """Refresh every source concurrently, returns True if anything changed.
+
+        Each source is fetched with its own timeout and applied as soon as it
+        arrives, and a failing one only makes its own statistics unavailable.
+        Entities are written once, when every source has been applied, however
+        many sources their statistics come from. Any open data is read first,
+        and sources it provides every statistic for are not fetched at all.
+        """
+        if not self.__parsers:
+            await self.__loop.run_in_executor(None, preload_parsers)
+            self.__parsers = True
+        sources = [source for source in self.__sources.values() if source.active]
+        fetched = []
+        succeeded = []
+        open_data = self.__open_data
+        with self.__router.batch():
+            if open_data is not None and open_data.active:
+                fetched.append(open_data)
+                result = await self.__refresh_source(open_data, fallback=True)
+                if result is not None:
+                    succeeded.append(result)
+                    sources = self.__skip_provided(sources, open_data.provided)
+            fetched += sources
+            results = await asyncio.gather(
+                *(self.__refresh_source(source) for source in sources)
+            )
+        updates, write_time = self.__router.last_flush
+        succeeded += [result for result in results if result is not None]
+        changed = sum(result[0] for result in succeeded)
+        errors = sum(result is None for result in results)
+        self.__failed = errors > 0
+        self.__publication_failed = any(
+            result is None
+            and any(statistic.id == ATTR_PUBLISHED for statistic in source.active)
+            for source, result in zip(sources, results)
+        )
+        if changed and self.__store is not None:
+            self.__store.async_delay_save(self.snapshot, SNAPSHOT_SAVE_DELAY)
+        self.__metrics.record(
+            datetime.now(),
+            **{
+                METRIC_FETCH: _ms(max((s.fetch_time for s in fetched), default=0.0)),
+                METRIC_BYTES: sum(s.received for s in fetched),
+                METRIC_PARSE: _ms(sum(s.parse_time for s in fetched)),
+                METRIC_CHANGED: changed,
+                METRIC_DISPATCH: _ms(sum(result[1] for result in succeeded)),
+                METRIC_WRITE: _ms(write_time),
+                METRIC_UPDATES: updates,
+                METRIC_ERRORS: errors,
+            },
+        )
+        return changed > 0
+
+    def __skip_provided(self, sources, provided):
+        """Return the sources with statistics the open data did not provide."""
+        remaining = []
+        for source in sources:
+            if not {statistic.id for statistic in source.active} <= provided:
+                remaining.append(source)
+                continue
+            if not source.available:
+                source.available = True
+                statistic_ids = [statistic.id for statistic in source.active]
+                statistic_ids += self.__derived.dependents(statistic_ids)
+                self.__router.set_available(statistic_ids, True)
+        return remaining
+
+    async def __refresh_source(self, source, fallback=False):
+        """Fetch and apply one source.
+
+        Returns the statistics changed and dispatch seconds, or None if the
+        source could not be fetched. A fallback source failing leaves
+        availability to the sources it falls back on.
+        """
+        statistic_ids = [statistic.id for statistic in source.active]
+        statistic_ids += self.__derived.dependents(statistic_ids)
+        try:
+            fetched = await source.fetch(self.__session)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as err:
+            if fallback:
+                _LOGGER.info("Unable to fetch %s, scraping: %s", source.url, err)
+                source.available = False
+                return None
+            _LOGGER.warning("Unable to fetch %s: %s", source.url, err)
+            if source.available:
+                source.available = False
+                self.__router.set_available(statistic_ids, False)
+            return None
+        changed = 0
+        dispatch_time = 0.0
+        if not source.available:
+            source.available = True
+            if not fallback:
+                self.__router.set_available(statistic_ids, True)
+        if fetched is not None:
+            _LOGGER.debug("%s changed, parsing", source.url)
+            dispatching = time.perf_counter()
+            changed = source.apply(fetched)
+            dispatch_time = time.perf_counter() - dispatching
+        return changed, dispatch_time
+
+    async def __track(self, scheduler):
+        while True:
+            _LOGGER.debug("track is checking for changes...")
+            try:
+                await self.refresh()
+            except Exception as err:
+                _LOGGER.error("Unable to refresh statistics")
+                _LOGGER.exception(err)
+                scheduler.failure()
+            else:
+                # Other sources failing only makes their statistics unavailable
+                if self.__publication_failed:
+                    scheduler.failure()
+                else:
+                    scheduler.success(self.published)
+            delay = scheduler.next_delay()
+            self.__metrics.schedule(scheduler.failures, delay)
+            _LOGGER.debug("track is sleeping for %d seconds...", delay.total_seconds())
+            await asyncio.sleep(delay.total_seconds())
+
+    def track(self, scheduler):
+        """Start tracking statistics on a schedule, returns the polling task."""
+        return self.__loop.create_task(self.__track(scheduler))
+
+
+def _ms(seconds):
+    """Return seconds as whole milliseconds."""
+    return round(seconds * 1000, 1)
+
+
+def _serialize(value):
+    """Return a JSON friendly representation of a statistic value."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
@@ -0,0 +1,156 @@
+"""Backfill NSW Covid long-term statistics from an archive of past publications.
+
+Streams a CSV or JSON lines archive (see custom_components/nswcovid/backfill.py
+for the layout) and imports it into a running Home Assistant through the
+websocket API, a chunk of days at a time. With --dry-run nothing is sent, and
+the rows that would be imported are counted instead.
+
+    python3 manage/backfill.py archive.csv --url http://homeassistant.local:8123
+    python3 manage/backfill.py archive.csv --dry-run
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+import aiohttp
+
+sys.path.insert(0, os.getcwd())
+
+from custom_components.nswcovid.backfill import chunks, read_archive  # noqa: E402
+from custom_components.nswcovid.const import BACKFILL_CHUNK_DAYS  # noqa: E402
+from custom_components.nswcovid.longterm import (  # noqa: E402
+    FIRST_DAY,
+    KIND_RESETTING,
+    build_rows,
+    metadata,
+    start_of,
+    statistic_id,
+    statistic_kind,
+    sum_before,
+)
+from custom_components.nswcovid.tracker import StatisticTracker  # noqa: E402
+
+
+class Importer:
+    """Send import_statistics commands over an authenticated websocket."""
+
+    def __init__(self, websocket):
+        self.__websocket = websocket
+        self.__id = 0
+
+    @classmethod
+    async def connect(cls, session, url, token):
+        websocket = await session.ws_connect(f"{url.rstrip('/')}/api/websocket")
+        await websocket.receive_json()
+        await websocket.send_json({"type": "auth", "access_token": token})
+        reply = await websocket.receive_json()
+        if reply.get("type") != "auth_ok":
+            raise SystemExit(f"Authentication failed: {reply.get('message')}")
+        return cls(websocket)
+
+    async def call(self, message):
+        self.__id += 1
+        await self.__websocket.send_json({"id": self.__id, **message})
+        return await self.__websocket.receive_json()
+
+    async def send(self, meta, rows):
+        reply = await self.call(
+            {
+                "type": "recorder/import_statistics",
+                "metadata": meta,
+                "stats": [{**row, "start": row["start"].isoformat()} for row in rows],
+            }
+        )
+        if not reply.get("success"):
+            raise SystemExit(f"Import of {meta['statistic_id']} failed: {reply}")
+
+    async def rows_before(self, key, day):
+        """Return the rows imported for key that start before day."""
+        long_term_id = statistic_id(key)
+        reply = await self.call(
+            {
+                "type": "recorder/statistics_during_period",
+                "start_time": start_of(FIRST_DAY).isoformat(),
+                "end_time": start_of(day).isoformat(),
+                "statistic_ids": [long_term_id],
+                "period": "hour",
+                "types": ["sum"],
+            }
+        )
+        if not reply.get("success"):
+            raise SystemExit(f"Reading {long_term_id} failed: {reply}")
+        # Starts are sent as milliseconds since the epoch, or ISO 8601 before
+        return [
+            {
+                **row,
+                "start": row["start"] / 1000
+                if isinstance(row["start"], (int, float))
+                else row["start"],
+            }
+            for row in reply["result"].get(long_term_id) or []
+        ]
+
+
+async def run(args):
+    statistics = StatisticTracker(asyncio.get_running_loop(), None).statistics
+    sums = {}
+    days = []
+    queued = 0
+    start = time.perf_counter()
+
+    async with aiohttp.ClientSession() as session:
+        importer = None
+        if not args.dry_run:
+            importer = await Importer.connect(session, args.url, args.token)
+        for series in chunks(read_archive(args.archive, statistics), args.chunk_days):
+            days.append(max((len(rows) for rows in series.values()), default=0))
+            for key, rows in series.items():
+                statistic = statistics[key]
+                if (
+                    importer is not None
+                    and key not in sums
+                    and statistic_kind(key, statistic) == KIND_RESETTING
+                ):
+                    # Carry on the running total from the rows already imported
+                    day = rows[0][0]
+                    sums[key] = sum_before(await importer.rows_before(key, day), day)
+                data = build_rows(key, statistic, rows, sums)
+                if not data:
+                    continue
+                if importer is not None:
+                    await importer.send(metadata(key, statistic), data)
+                queued += len(data)
+
+    elapsed = time.perf_counter() - start
+    if not queued:
+        print(f"Nothing to import from {args.archive}")
+        return
+    print(
+        f"{'Counted' if args.dry_run else 'Imported'} {queued} rows "
+        f"from {sum(days)} publications in {elapsed:.2f}s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("archive", help="CSV or JSON lines archive")
+    parser.add_argument("--url", default="http://localhost:8123")
+    parser.add_argument(
+        "--token",
+        default=os.environ.get("HASS_TOKEN"),
+        help="Long lived access token, defaults to $HASS_TOKEN",
+    )
+    parser.add_argument("--chunk-days", type=int, default=BACKFILL_CHUNK_DAYS)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    if not args.dry_run and not args.token:
+        parser.error("a token is needed unless --dry-run is given")
+
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(run(args))
+
+
+main()
@@ -0,0 +1,384 @@
+"""Offline benchmarks for the NSW Covid integration.
+
+Serves the fixtures in tests/fixtures through aresponses and reports timings
+as JSON, so results can be compared between releases.
+
+    python3 manage/benchmark.py [--repeat 20] [--output bench.json]
+
+Importing the integration is also timed in fresh interpreters, and the run
+fails when it exceeds its budget or imports the scraping libraries.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import aiohttp
+from aiohttp import web
+from aresponses import ResponsesMockServer
+from nswcovid.protocol.data_sources import DATA_SOURCES
+from nswcovid.protocol.statistics import Statistic
+
+sys.path.insert(0, os.getcwd())
+
+from custom_components.nswcovid.buckets import AgeSexBuckets  # noqa: E402
+from custom_components.nswcovid.const import (  # noqa: E402
+    ATTR_CASES,
+    ATTR_DOSES,
+    ATTR_LIVES_LOST,
+)
+from custom_components.nswcovid.sensor import (  # noqa: E402
+    ACTIVE_SENSORS,
+    NSWCovidCases,
+    NSWCovidDeaths,
+    NSWCovidDoses,
+    NSWCovidEntry,
+)
+from custom_components.nswcovid.tracker import StatisticTracker  # noqa: E402
+
+FIXTURES = f"{os.getcwd()}/tests/fixtures"
+
+# Served from tests/fixtures like the pages, by file name
+OPEN_DATA_URLS = {
+    "csv": "https://data.nsw.gov.au/opendata.csv",
+    "json": "https://data.nsw.gov.au/opendata.json",
+}
+
+# Already imported by Home Assistant before it loads any integration
+IMPORT_PRELOADED = (
+    "aiohttp",
+    "homeassistant.components.sensor",
+    "homeassistant.config_entries",
+    "homeassistant.helpers.aiohttp_client",
+    "homeassistant.helpers.restore_state",
+    "homeassistant.helpers.storage",
+)
+
+# Milliseconds each module may take to import on top of IMPORT_PRELOADED
+IMPORT_BUDGETS = {
+    "custom_components.nswcovid": 50,
+    "custom_components.nswcovid.config_flow": 50,
+}
+
+# Libraries that are only imported when an entry is set up or refreshed
+DEFERRED_IMPORTS = ("nswcovid", "bs4", "jello", "lxml")
+
+IMPORT_PROBE = """
+import sys, time
+for name in {preloaded!r}:
+    __import__(name)
+start = time.perf_counter()
+__import__({module!r})
+print((time.perf_counter() - start) * 1000)
+print(" ".join(name for name in {deferred!r} if name in sys.modules))
+"""
+
+RENDERED_PROPERTIES = [
+    "state",
+    "extra_state_attributes",
+    "unit_of_measurement",
+    "device_class",
+    "state_class",
+    "icon",
+    "name",
+    "unique_id",
+]
+
+RENDER_WRITES = 100
+
+
+class FixtureServer:
+    """Serve fixtures by file name, honouring If-None-Match when asked to."""
+
+    def __init__(self, validators=True):
+        self.validators = validators
+        self.requests = 0
+        self.__fixtures = {}
+        for name in os.listdir(FIXTURES):
+            with open(f"{FIXTURES}/{name}", "rb") as fixture:
+                body = fixture.read()
+            self.__fixtures[name] = (body, f'"{hash(body):x}"')
+
+    async def handler(self, request):
+        self.requests += 1
+        name = os.path.basename(request.path)
+        if name not in self.__fixtures:
+            return web.Response(status=404)
+        body, etag = self.__fixtures[name]
+        if self.validators and request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304)
+        headers = {"ETag": etag} if self.validators else {}
+        return web.Response(body=body, headers=headers)
+
+
+class Subscriber:
+    """Counts the times the router advises it."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def async_device_changed(self):
+        self.calls += 1
+
+
+def timed(func, repeat):
+    """Return the median wall time of func in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+async def atimed(func, repeat):
+    """Return the median wall time of the coroutine function in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def build_entities(tracker):
+    """Create the entities the sensor platform would create."""
+    entities = [
+        NSWCovidEntry(tracker.statistics[statistic_id], tracker.router)
+        for statistic_id in ACTIVE_SENSORS
+        if statistic_id in tracker.statistics
+    ]
+    entities.append(NSWCovidDeaths(tracker.statistics, tracker.router))
+    entities.append(NSWCovidCases(tracker.statistics, tracker.router))
+    entities.append(NSWCovidDoses(tracker.statistics, tracker.router))
+    return entities
+
+
+async def benchmark_fetch(session, server, repeat):
+    """Time cold, unchanged and validator-less refreshes."""
+    loop = asyncio.get_running_loop()
+    results = {}
+
+    async def cold():
+        await StatisticTracker(loop, session).refresh()
+
+    results["fetch_parse_cold_ms"] = await atimed(cold, repeat)
+
+    for data_format, url in OPEN_DATA_URLS.items():
+
+        async def open_data(url=url):
+            await StatisticTracker(loop, session, open_data_url=url).refresh()
+
+        results[f"open_data_{data_format}_cold_ms"] = await atimed(open_data, repeat)
+    requests = server.requests
+    await StatisticTracker(loop, session, open_data_url=url).refresh()
+    results["requests_per_open_data_refresh"] = server.requests - requests
+
+    tracker = StatisticTracker(loop, session)
+    payloads = []
+    tracker.addListener(payloads.append)
+    requests = server.requests
+    await tracker.refresh()
+    results["requests_per_refresh"] = server.requests - requests
+    results["events_per_cold_refresh"] = len(payloads)
+
+    payloads_cold = list(payloads)
+    payloads.clear()
+    results["refresh_not_modified_ms"] = await atimed(tracker.refresh, repeat)
+    results["events_per_unchanged_refresh"] = len(payloads) / repeat
+
+    server.validators = False
+    payloads.clear()
+    results["refresh_unchanged_hash_ms"] = await atimed(tracker.refresh, repeat)
+    results["events_per_unchanged_hash_refresh"] = len(payloads) / repeat
+    server.validators = True
+
+    return results, tracker, payloads_cold
+
+
+def benchmark_dispatch(tracker, payloads, repeat):
+    """Time routing a full publication's events to every entity."""
+    entities = build_entities(tracker)
+    subscribers = []
+    for entity in entities:
+        subscriber = Subscriber()
+        subscribers.append(subscriber)
+        tracker.router.subscribe(
+            entity.statistic_ids,
+            subscriber,
+            getattr(entity, "async_statistic_changed", None),
+        )
+
+    def dispatch():
+        with tracker.router.batch():
+            for payload in payloads:
+                tracker.router.dispatch(payload)
+
+    elapsed = timed(dispatch, repeat)
+    return {
+        "dispatch_ms_per_refresh": elapsed,
+        "dispatch_us_per_event": elapsed * 1000 / max(len(payloads), 1),
+        "listener_invocations_per_refresh": sum(s.calls for s in subscribers) / repeat,
+    }
+
+
+def benchmark_render(tracker, repeat):
+    """Time reading the state properties HA reads on every write."""
+    entities = build_entities(tracker)
+    results = {}
+
+    def render():
+        for entity in entities:
+            for prop in RENDERED_PROPERTIES:
+                getattr(entity, prop, None)
+
+    results["render_all_entities_us"] = timed(render, repeat) * 1000
+
+    # One statistic sensor written once, averaged over many writes of each
+    entries = [entity for entity in entities if isinstance(entity, NSWCovidEntry)]
+
+    def render_entries():
+        for _ in range(RENDER_WRITES):
+            for entity in entries:
+                for prop in RENDERED_PROPERTIES:
+                    getattr(entity, prop, None)
+
+    results["render_entry_us_per_write"] = (
+        timed(render_entries, repeat) * 1000 / (RENDER_WRITES * len(entries))
+    )
+    for entity in entities:
+        if entity.unique_id not in (ATTR_LIVES_LOST, ATTR_CASES, ATTR_DOSES):
+            continue
+
+        def render_one(entity=entity):
+            for prop in RENDERED_PROPERTIES:
+                getattr(entity, prop, None)
+
+        results[f"render_{entity.unique_id}_us"] = timed(render_one, repeat) * 1000
+    results["entities"] = len(entities)
+    return results
+
+
+def allocated(build):
+    """Return the bytes still allocated by what build returns."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def benchmark_memory(tracker):
+    """Compare the case buckets with the per statistic objects they replace."""
+    keys = AgeSexBuckets(ATTR_CASES).keys
+
+    def statistics():
+        return [
+            Statistic(
+                handler=tracker, id=key, data=DATA_SOURCES[key], event_listeners=[]
+            )
+            for key in keys
+        ]
+
+    def values():
+        return {key: index * 1000 for index, key in enumerate(keys)}
+
+    def buckets():
+        store = AgeSexBuckets(ATTR_CASES)
+        for index, key in enumerate(keys):
+            store.set(key, index * 1000)
+        return store
+
+    return {
+        "memory_case_statistics_bytes": allocated(statistics),
+        "memory_case_values_dict_bytes": allocated(values),
+        "memory_case_buckets_bytes": allocated(buckets),
+    }
+
+
+def benchmark_imports(repeat):
+    """Time each import in fresh interpreters, returns results and failures."""
+    results = {}
+    failures = []
+    for module, budget in IMPORT_BUDGETS.items():
+        probe = IMPORT_PROBE.format(
+            preloaded=IMPORT_PRELOADED, module=module, deferred=DEFERRED_IMPORTS
+        )
+        samples = []
+        # The first run only writes the bytecode caches
+        for _ in range(repeat + 1):
+            output = subprocess.run(
+                [sys.executable, "-c", probe],
+                capture_output=True,
+                check=True,
+                cwd=os.getcwd(),
+                text=True,
+            ).stdout.splitlines()
+            samples.append(float(output[0]))
+            loaded = output[1].split() if len(output) > 1 else []
+        elapsed = statistics.median(samples[1:])
+        results[f"import_{module.rsplit('.', 1)[-1]}_ms"] = elapsed
+        if elapsed > budget:
+            failures.append(f"{module} took {elapsed:.1f}ms, budget {budget}ms")
+        if loaded:
+            failures.append(f"{module} imported {', '.join(loaded)}")
+    return results, failures
+
+
+async def run(repeat):
+    server = FixtureServer()
+    results = {}
+    async with ResponsesMockServer() as mock:
+        mock.add(mock.ANY, response=server.handler, repeat=math.inf)
+        async with aiohttp.ClientSession() as session:
+            fetched, tracker, payloads = await benchmark_fetch(session, server, repeat)
+            results.update(fetched)
+            results.update(benchmark_dispatch(tracker, payloads, repeat))
+            results.update(benchmark_render(tracker, repeat))
+            results.update(benchmark_memory(tracker))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="Write results to this file")
+    parser.add_argument("--import-repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with open(
+        f"{os.getcwd()}/custom_components/nswcovid/manifest.json"
+    ) as manifestfile:
+        version = json.load(manifestfile)["version"]
+
+    results, failures = benchmark_imports(args.import_repeat)
+    results.update(asyncio.run(run(args.repeat)))
+    report = {
+        "version": version,
+        "python": platform.python_version(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    output = json.dumps(report, indent=4, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as outputfile:
+            outputfile.write(output)
+    else:
+        print(output)
+
+    for failure in failures:
+        print(f"Over budget: {failure}", file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+main()
@@ -0,0 +1,108 @@
+"""Scrape NSW Health once and serve the statistics to many Home Assistants.
+
+Runs the integration's tracker on its usual publication aware schedule and
+serves a compact JSON snapshot of every statistic at /snapshot.json, with an
+ETag so unchanged snapshots cost a 304. Set each instance's snapshot URL to
+it and the fleet makes one upstream request per interval, however many
+instances read it. --upstream scrapes a local stand-in instead of NSW Health,
+and --open-data reads a CSV or JSON dataset first, only scraping for what it
+does not provide.
+
+    python3 manage/fetcher.py [--host 0.0.0.0] [--port 8080]
+    python3 manage/fetcher.py --upstream http://127.0.0.1:8765
+    python3 manage/fetcher.py --open-data https://example.com/covid.csv
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, os.getcwd())
+
+from custom_components.nswcovid.scheduler import PollScheduler  # noqa: E402
+from custom_components.nswcovid.snapshot import document, etag  # noqa: E402
+from custom_components.nswcovid.tracker import StatisticTracker  # noqa: E402
+
+_LOGGER = logging.getLogger("fetcher")
+
+SNAPSHOT_PATH = "/snapshot.json"
+
+
+class Publisher:
+    """Rebuild the snapshot after every refresh that changed it."""
+
+    entity_id = "snapshot"
+
+    def __init__(self, tracker):
+        self.__tracker = tracker
+        self.body = None
+        self.etag = None
+
+    def async_device_changed(self):
+        body = document(self.__tracker.statistics)
+        if body == self.body:
+            return
+        self.body = body
+        self.etag = etag(body)
+        _LOGGER.info("Serving new snapshot %s, %d bytes", self.etag, len(body))
+
+    async def handle(self, request):
+        if self.body is None:
+            return web.Response(status=503, headers={"Retry-After": "60"})
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if self.etag in request.headers.get("If-None-Match", ""):
+            return web.Response(status=304, headers=headers)
+        return web.Response(
+            body=self.body, content_type="application/json", headers=headers
+        )
+
+
+async def run(args):
+    async with aiohttp.ClientSession() as session:
+        tracker = StatisticTracker(
+            asyncio.get_running_loop(), session, open_data_url=args.open_data
+        )
+        if args.upstream:
+            for source in tracker.sources:
+                if source.url == args.open_data:
+                    continue
+                path = source.url.split("/", 3)[3]
+                source.url = f"{args.upstream.rstrip('/')}/{path}"
+        publisher = Publisher(tracker)
+        tracker.metrics.subscribe(publisher)
+
+        app = web.Application()
+        app.router.add_get(SNAPSHOT_PATH, publisher.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, args.host, args.port).start()
+        _LOGGER.info("Serving http://%s:%d%s", args.host, args.port, SNAPSHOT_PATH)
+
+        task = tracker.track(PollScheduler())
+        try:
+            await task
+        finally:
+            task.cancel()
+            await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--upstream", help="Scrape this base URL instead")
+    parser.add_argument("--open-data", help="Read this CSV or JSON dataset first")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
+
+
+main()
@@ -0,0 +1 @@
+"""Tests for the NSW Covid integration."""
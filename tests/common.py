@@ -0,0 +1,53 @@
+"""Helpers shared by the NSW Covid tests."""
+from contextlib import asynccontextmanager
+import math
+import os
+
+import aiohttp
+from aiohttp import web
+from aresponses import ResponsesMockServer
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+class FixtureServer:
+    """Serve fixtures by file name with an ETag, counting requests by name.
+
+    Fixtures named in failing are answered with a server error instead.
+    """
+
+    def __init__(self):
+        self.requests = {}
+        self.failing = set()
+        self.__fixtures = {}
+        for name in os.listdir(FIXTURES):
+            with open(os.path.join(FIXTURES, name), "rb") as fixture:
+                body = fixture.read()
+            self.__fixtures[name] = (body, f'"{hash(body):x}"')
+
+    @property
+    def total(self):
+        """Return the number of requests served."""
+        return sum(self.requests.values())
+
+    async def handler(self, request):
+        name = os.path.basename(request.path)
+        self.requests[name] = self.requests.get(name, 0) + 1
+        if name in self.failing:
+            return web.Response(status=500)
+        if name not in self.__fixtures:
+            return web.Response(status=404)
+        body, etag = self.__fixtures[name]
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304)
+        return web.Response(body=body, headers={"ETag": etag})
+
+
+@asynccontextmanager
+async def serve_fixtures():
+    """Serve tests/fixtures in place of every upstream, yields server and session."""
+    server = FixtureServer()
+    async with ResponsesMockServer() as mock:
+        mock.add(mock.ANY, response=server.handler, repeat=math.inf)
+        async with aiohttp.ClientSession() as session:
+            yield server, session
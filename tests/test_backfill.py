@@ -0,0 +1,15 @@
+"""Tests for reading archives of past NSW Covid publications."""
+from datetime import date
+
+from custom_components.nswcovid.backfill import chunks
+
+
+def test_chunks_skip_days_without_values():
+    """A window of publications without any values yields no chunk."""
+    publications = [
+        (date(2021, 9, 1), {}),
+        (date(2021, 9, 2), {}),
+        (date(2021, 9, 3), {"daily": 1}),
+    ]
+    assert list(chunks(publications, 2)) == [{"daily": [(date(2021, 9, 3), 1)]}]
+    assert list(chunks([], 2)) == []
@@ -0,0 +1,144 @@
+"""Tests for the lifecycle of the NSW Covid coordinator."""
+import asyncio
+from datetime import timedelta
+
+import pytest
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry
+
+from custom_components.nswcovid.const import DOMAIN
+from custom_components.nswcovid.coordinator import NSWCovidCoordinator
+
+from .common import serve_fixtures
+
+RELOADS = 5
+REFRESHES = 3
+
+
+class Scheduler:
+    """Poll on a short fixed interval, signalling after a number of refreshes."""
+
+    failures = 0
+
+    def __init__(self, refreshes):
+        self.refreshes = 0
+        self.done = asyncio.Event()
+        self.__target = refreshes
+
+    def success(self, published):
+        self.refreshes += 1
+        if self.refreshes >= self.__target:
+            self.done.set()
+
+    def failure(self):
+        self.failures += 1
+
+    def next_delay(self):
+        if self.done.is_set():
+            return timedelta(hours=1)
+        return timedelta(seconds=0.01)
+
+
+def config_entry():
+    """Return a config entry for the integration."""
+    return ConfigEntry(
+        version=2,
+        minor_version=1,
+        domain=DOMAIN,
+        title="NSW Covid",
+        data={},
+        source="user",
+        options={},
+    )
+
+
+def track_tasks():
+    """Return the tracking tasks that are still running."""
+    return [
+        task
+        for task in asyncio.all_tasks()
+        if not task.done() and task.get_coro().__qualname__.endswith(".__track")
+    ]
+
+
+@pytest.mark.asyncio
+async def test_reload_leaves_one_tracker(tmp_path, monkeypatch):
+    """Reloading the entry never leaves more than one tracker polling."""
+    hass = HomeAssistant(str(tmp_path))
+    entry = config_entry()
+    async with serve_fixtures() as (server, session):
+        monkeypatch.setattr(
+            "custom_components.nswcovid.coordinator.async_get_clientsession",
+            lambda hass: session,
+        )
+        coordinator = None
+        for _ in range(RELOADS):
+            # As async_unload_entry and async_setup_entry do on a reload
+            if coordinator is not None:
+                await coordinator.async_shutdown()
+            coordinator = NSWCovidCoordinator(hass, entry)
+            await coordinator.async_restore()
+            requests = server.total
+            scheduler = Scheduler(REFRESHES)
+            coordinator.start(scheduler)
+            # Let the refresh start before reloading in the middle of it
+            await asyncio.sleep(0)
+
+        await asyncio.wait_for(scheduler.done.wait(), 10)
+        assert len(track_tasks()) == 1
+        assert scheduler.failures == 0
+        assert server.total - requests == REFRESHES * len(coordinator.tracker.sources)
+
+        await coordinator.async_shutdown()
+        assert not coordinator.running
+        assert not track_tasks()
+    await hass.async_stop(force=True)
+
+
+class Entity:
+    """An entity reading one statistic."""
+
+    entity_id = None
+    entity_registry_enabled_default = True
+
+    def __init__(self, unique_id):
+        self.unique_id = unique_id
+        self.statistic_ids = (unique_id,)
+
+
+@pytest.mark.asyncio
+async def test_registry_changes_of_other_entries_are_ignored(tmp_path):
+    """Only enabling or disabling the entry's own entities is followed."""
+    hass = HomeAssistant(str(tmp_path))
+    await entity_registry.async_load(hass)
+    registry = entity_registry.async_get(hass)
+    entry = config_entry()
+    other = config_entry()
+    coordinator = NSWCovidCoordinator(hass, entry)
+    updates = []
+    coordinator.async_update_enabled = lambda: updates.append(True)
+
+    ours = registry.async_get_or_create(
+        "sensor", DOMAIN, "locally_active", config_entry=entry
+    )
+    theirs = registry.async_get_or_create("sensor", "other", "x", config_entry=other)
+    coordinator.add_entities([Entity("locally_active")])
+    await hass.async_block_till_done()
+    updates.clear()
+
+    registry.async_update_entity(
+        theirs.entity_id, disabled_by=entity_registry.RegistryEntryDisabler.USER
+    )
+    registry.async_update_entity(ours.entity_id, name="Renamed")
+    await hass.async_block_till_done()
+    assert not updates
+
+    registry.async_update_entity(
+        ours.entity_id, disabled_by=entity_registry.RegistryEntryDisabler.USER
+    )
+    await hass.async_block_till_done()
+    assert len(updates) == 1
+
+    await coordinator.async_shutdown()
+    await hass.async_stop(force=True)
@@ -0,0 +1,26 @@
+"""Tests for the sensor descriptions of NSW Covid statistics."""
+from types import SimpleNamespace
+
+from homeassistant.components.sensor import SensorStateClass
+
+from custom_components.nswcovid.const import ATTR_TOTAL_TOTAL_DOSE
+from custom_components.nswcovid.descriptions import DEFAULT_ICON, describe
+from custom_components.nswcovid.tracker import StatisticTracker
+
+
+def test_describe_every_statistic():
+    """Every statistic has an icon, and a state class Home Assistant knows."""
+    for statistic in StatisticTracker(None, None).statistics.values():
+        description = describe(statistic)
+        assert description.icon, statistic.id
+        assert description.state_class in (None, *SensorStateClass), statistic.id
+    total = StatisticTracker(None, None).statistics[ATTR_TOTAL_TOTAL_DOSE]
+    assert describe(total).state_class is SensorStateClass.TOTAL
+
+
+def test_describe_without_an_icon():
+    """Statistics with an empty icon fall back to the default."""
+    statistic = SimpleNamespace(
+        id="example", name="Example", iconId="", typeName="integer", unit="case"
+    )
+    assert describe(statistic).icon == DEFAULT_ICON
@@ -0,0 +1,20 @@
+"""Tests for the statistic groups offered in the options flow."""
+from custom_components.nswcovid.const import ACTIVE_SENSORS, GROUPS
+from custom_components.nswcovid.router import StatisticRouter
+from custom_components.nswcovid.sensor import (
+    NSWCovidCases,
+    NSWCovidDeaths,
+    NSWCovidDoses,
+)
+from custom_components.nswcovid.tracker import StatisticTracker
+
+
+def test_every_grouped_statistic_has_an_entity():
+    """Nothing is fetched for a group without an entity to show it."""
+    statistics = StatisticTracker(None, None).statistics
+    router = StatisticRouter()
+    shown = set(ACTIVE_SENSORS)
+    for aggregate in (NSWCovidCases, NSWCovidDeaths, NSWCovidDoses):
+        shown.update(aggregate(statistics, router).statistic_ids)
+    for group, statistic_ids in GROUPS.items():
+        assert not set(statistic_ids) - shown, group
@@ -0,0 +1,36 @@
+"""Tests for building long-term statistics from NSW Covid publications."""
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+from custom_components.nswcovid.longterm import build_rows, start_of, sum_before
+
+DAILY = SimpleNamespace(name="Daily", unit="case", resetting=True)
+
+ARCHIVE = [(date(2021, 9, 1) + timedelta(days=day), day + 1) for day in range(6)]
+
+
+def test_backfill_carries_on_the_imported_total():
+    """A resetting statistic's sum continues from the last row imported."""
+    imported = build_rows("daily", DAILY, ARCHIVE[:3], {})
+    sums = {"daily": sum_before(imported, ARCHIVE[3][0])}
+    rows = build_rows("daily", DAILY, ARCHIVE[3:], sums)
+    assert [row["sum"] for row in imported + rows] == [1, 3, 6, 10, 15, 21]
+
+
+def test_backfill_over_imported_days_reproduces_the_sums():
+    """Importing days again gives them the sums they were first imported with."""
+    imported = build_rows("daily", DAILY, ARCHIVE, {})
+    sums = {"daily": sum_before(imported, ARCHIVE[2][0])}
+    again = build_rows("daily", DAILY, ARCHIVE[2:], sums)
+    assert [row["sum"] for row in again] == [row["sum"] for row in imported[2:]]
+
+
+def test_sum_before_reads_recorder_timestamps():
+    """Rows started at a timestamp or ISO 8601 string are read alike."""
+    rows = [
+        {"start": start_of(ARCHIVE[0][0]).timestamp(), "sum": 1},
+        {"start": start_of(ARCHIVE[1][0]).isoformat(), "sum": 3},
+    ]
+    assert sum_before(rows, ARCHIVE[1][0]) == 1
+    assert sum_before(rows, ARCHIVE[2][0]) == 3
+    assert sum_before([], ARCHIVE[0][0]) == 0
@@ -0,0 +1,21 @@
+"""Tests for reading NSW Covid statistics from open data."""
+import pytest
+
+from custom_components.nswcovid.opendata import FORMAT_CSV, OpenDataExtractor
+from custom_components.nswcovid.tracker import StatisticTracker
+
+DATASET = (
+    "date,notes,active_cases\r\n"
+    '2021-09-30,"revised\r\nfigures, see ""notes""",100\r\n'
+    '2021-10-01,"first line\nsecond line",123\r\n'
+).encode()
+
+
+@pytest.mark.parametrize("size", [1, 2, 5, 17, len(DATASET)])
+def test_quoted_line_breaks_stay_in_their_row(size):
+    """A line break in a quoted field does not split its row."""
+    statistics = StatisticTracker(None, None).statistics.values()
+    extractor = OpenDataExtractor(statistics, FORMAT_CSV)
+    for start in range(0, len(DATASET), size):
+        extractor.feed(DATASET[start : start + size])
+    assert extractor.close()["locally_active"] == 123
@@ -0,0 +1,34 @@
+"""Tests for extracting statistics from the NSW Health page."""
+import os
+
+import pytest
+
+from custom_components.nswcovid.parser import StreamingExtractor, extract
+from custom_components.nswcovid.tracker import StatisticTracker
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+@pytest.fixture(name="page")
+def page_fixture():
+    """Return the statistics read from the main page, and the page."""
+    tracker = StatisticTracker(None, None)
+    source = next(s for s in tracker.sources if s.url.endswith(".aspx"))
+    with open(os.path.join(FIXTURES, "stats-nsw.aspx"), "rb") as fixture:
+        return source.active, fixture.read()
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 1000, 16384])
+def test_streaming_matches_whole_page(page, size):
+    """Values are the same however the page is chunked, stopping when complete."""
+    statistics, body = page
+    expected = extract(statistics, body)
+    for offset in range(min(size, 32)):
+        extractor = StreamingExtractor(statistics)
+        chunks = [body[:offset]]
+        chunks += [body[i : i + size] for i in range(offset, len(body), size)]
+        for chunk in chunks:
+            extractor.feed(chunk)
+            if extractor.complete:
+                break
+        assert extractor.close() == expected
@@ -0,0 +1,121 @@
+"""Tests for routing statistic events to the entities that use them."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from custom_components.nswcovid.buckets import layout
+from custom_components.nswcovid.const import (
+    ACTIVE_SENSORS,
+    ATTR_CASES,
+    ATTR_LOCALLY_ACTIVE,
+    ATTR_NSW_HEALTH_DOSES_DAILY,
+)
+from custom_components.nswcovid.router import StatisticRouter
+from custom_components.nswcovid.tracker import StatisticTracker
+
+from .common import serve_fixtures
+
+
+class Entity:
+    """Count the times the router advises an entity, and its changes."""
+
+    def __init__(self, statistic_ids):
+        self.statistic_ids = tuple(statistic_ids)
+        self.writes = 0
+        self.changes = 0
+
+    def async_device_changed(self):
+        self.writes += 1
+
+    def async_statistic_changed(self, statistic):
+        self.changes += 1
+
+
+def payload(statistic_id):
+    """Return a statistic_updated event for statistic_id."""
+    return SimpleNamespace(
+        event_type="statistic_updated",
+        id=statistic_id,
+        ts=0,
+        subject=SimpleNamespace(id=statistic_id),
+    )
+
+
+def test_dispatch_only_reaches_subscribers():
+    """An event is routed to the entities subscribed to its statistic only."""
+    router = StatisticRouter()
+    first = Entity(["a", "b"])
+    second = Entity(["c"])
+    router.subscribe(first.statistic_ids, first)
+    unsubscribe = router.subscribe(second.statistic_ids, second)
+
+    router.dispatch(payload("a"))
+    router.dispatch(payload("d"))
+    assert (first.writes, second.writes) == (1, 0)
+
+    unsubscribe()
+    router.dispatch(payload("c"))
+    assert second.writes == 0
+
+
+def test_batch_writes_each_entity_once():
+    """Within a batch every change is seen, but the entity is written once."""
+    router = StatisticRouter()
+    entity = Entity(["a", "b"])
+    router.subscribe(entity.statistic_ids, entity, entity.async_statistic_changed)
+    with router.batch():
+        for statistic_id in ("a", "b", "a"):
+            router.dispatch(payload(statistic_id))
+        assert entity.writes == 0
+    assert (entity.changes, entity.writes) == (3, 1)
+    assert router.last_flush[0] == 1
+
+
+def test_failing_change_hook_does_not_stop_dispatch():
+    """An entity failing to apply a change does not keep it from the others."""
+    router = StatisticRouter()
+    failing = Entity(["a"])
+    failing.async_statistic_changed = lambda statistic: 1 / 0
+    entity = Entity(["a"])
+    router.subscribe(failing.statistic_ids, failing, failing.async_statistic_changed)
+    router.subscribe(entity.statistic_ids, entity, entity.async_statistic_changed)
+    with router.batch():
+        router.dispatch(payload("a"))
+    assert (entity.changes, entity.writes) == (1, 1)
+    assert failing.writes == 1
+
+
+@pytest.mark.asyncio
+async def test_one_write_per_refresh():
+    """A refresh writes each entity with a changed statistic exactly once."""
+    async with serve_fixtures() as (server, session):
+        tracker = StatisticTracker(asyncio.get_running_loop(), session)
+        entities = [
+            Entity([statistic_id])
+            for statistic_id in ACTIVE_SENSORS
+            if statistic_id in tracker.statistics
+        ]
+        cases = Entity(layout(ATTR_CASES)[0])
+        # Read from the main page and the vaccination metrics
+        mixed = Entity([ATTR_LOCALLY_ACTIVE, ATTR_NSW_HEALTH_DOSES_DAILY])
+        entities += [cases, mixed]
+        for entity in entities:
+            tracker.router.subscribe(
+                entity.statistic_ids, entity, entity.async_statistic_changed
+            )
+
+        await tracker.refresh()
+        changed = [entity for entity in entities if entity.changes]
+        assert cases.changes == len(cases.statistic_ids)
+        assert mixed.changes == 2
+        assert len(changed) > len(entities) / 2
+        assert all(entity.writes == 1 for entity in changed)
+        assert all(entity.writes == 0 for entity in entities if not entity.changes)
+
+        for entity in entities:
+            entity.writes = entity.changes = 0
+        requests = server.total
+        await tracker.refresh()
+        assert server.total - requests == len(tracker.sources)
+        assert sum(entity.writes for entity in entities) == 0
@@ -0,0 +1,21 @@
+"""Tests for the publication aware polling schedule."""
+from custom_components.nswcovid.const import DEFAULT_MAX_BACKOFF, DEFAULT_RETRY_INTERVAL
+from custom_components.nswcovid.scheduler import PollScheduler
+
+
+def test_backoff_is_capped_after_a_long_outage():
+    """However many refreshes fail, the delay stays within the maximum."""
+    scheduler = PollScheduler()
+    for _ in range(1000):
+        scheduler.failure()
+    delay = scheduler.next_delay()
+    assert DEFAULT_MAX_BACKOFF / 2 <= delay <= DEFAULT_MAX_BACKOFF
+
+
+def test_backoff_doubles():
+    """Each failure doubles the delay, with up to half of it as jitter."""
+    scheduler = PollScheduler()
+    for failures in range(1, 5):
+        scheduler.failure()
+        backoff = DEFAULT_RETRY_INTERVAL * 2 ** (failures - 1)
+        assert backoff / 2 <= scheduler.next_delay() <= backoff
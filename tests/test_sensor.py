@@ -0,0 +1,50 @@
+"""Tests for the NSW Covid sensor entities."""
+import asyncio
+import logging
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from custom_components.nswcovid.const import ATTR_NSW_HEALTH_DOSES_DAILY
+from custom_components.nswcovid.sensor import NSWCovidDoses
+from custom_components.nswcovid.tracker import StatisticTracker
+
+from .common import serve_fixtures
+
+
+@pytest.mark.asyncio
+async def test_doses_attributes_are_rebuilt_only_on_change(tmp_path, caplog):
+    """Reading the attributes is free until a dose statistic changes."""
+    hass = HomeAssistant(str(tmp_path))
+    caplog.set_level(logging.ERROR)
+    async with serve_fixtures() as (_server, session):
+        tracker = StatisticTracker(asyncio.get_running_loop(), session)
+        doses = NSWCovidDoses(tracker.statistics, tracker.router)
+        doses.hass = hass
+        doses.entity_id = "sensor.nsw_health_doses"
+        # As async_added_to_hass subscribes
+        tracker.router.subscribe(
+            doses.statistic_ids, doses, doses.async_statistic_changed
+        )
+        before = doses.extra_state_attributes
+        assert doses.extra_state_attributes is before
+
+        await tracker.refresh()
+        after = doses.extra_state_attributes
+        assert after is not before
+        assert after is doses.extra_state_attributes
+        assert after[ATTR_NSW_HEALTH_DOSES_DAILY] is not None
+        assert (
+            after[ATTR_NSW_HEALTH_DOSES_DAILY]
+            == tracker.statistics[ATTR_NSW_HEALTH_DOSES_DAILY].status
+        )
+        with pytest.raises(TypeError):
+            after[ATTR_NSW_HEALTH_DOSES_DAILY] = 0
+
+    # Written once by the refresh, without any error behind the router
+    state = hass.states.get(doses.entity_id)
+    assert state.attributes[ATTR_NSW_HEALTH_DOSES_DAILY] == (
+        after[ATTR_NSW_HEALTH_DOSES_DAILY]
+    )
+    assert not [record for record in caplog.records if record.levelno >= logging.ERROR]
+    await hass.async_stop(force=True)
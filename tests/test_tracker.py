@@ -0,0 +1,60 @@
+"""Tests for polling NSW Covid statistics on a schedule."""
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+from custom_components.nswcovid.scheduler import PollScheduler
+from custom_components.nswcovid.tracker import StatisticTracker
+
+from .common import serve_fixtures
+
+# Far longer than any interval of the publication aware schedule
+RETRY_INTERVAL = timedelta(days=30)
+
+
+class Scheduler(PollScheduler):
+    """Keep the first delay picked, and signal it was."""
+
+    def __init__(self):
+        super().__init__(retry_interval=RETRY_INTERVAL, max_backoff=RETRY_INTERVAL)
+        self.delay = None
+        self.picked = asyncio.Event()
+
+    def next_delay(self, now=None):
+        self.delay = super().next_delay(now)
+        self.picked.set()
+        return self.delay
+
+
+async def first_delay(failing):
+    """Return the scheduler after one refresh with the failing fixtures."""
+    async with serve_fixtures() as (server, session):
+        server.failing.update(failing)
+        tracker = StatisticTracker(asyncio.get_running_loop(), session)
+        scheduler = Scheduler()
+        task = tracker.track(scheduler)
+        try:
+            await asyncio.wait_for(scheduler.picked.wait(), 10)
+        finally:
+            task.cancel()
+        return tracker, scheduler
+
+
+@pytest.mark.asyncio
+async def test_failing_source_keeps_the_schedule():
+    """A source other than the publication's failing does not back off."""
+    tracker, scheduler = await first_delay({"stats.json"})
+    assert tracker.failed
+    assert not tracker.publication_failed
+    assert scheduler.failures == 0
+    assert scheduler.delay < RETRY_INTERVAL / 2
+
+
+@pytest.mark.asyncio
+async def test_failing_publication_backs_off():
+    """The publication's source failing backs off every source."""
+    tracker, scheduler = await first_delay({"stats-nsw.aspx"})
+    assert tracker.publication_failed
+    assert scheduler.failures == 1
+    assert scheduler.delay >= RETRY_INTERVAL / 2